@@ -0,0 +1,257 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, case, desc, extract, func, select, union_all
+from sqlalchemy.orm import contains_eager
+
+from models import db, Transaction, ArchivedTransaction, Category, Budget, MonthlySummary, money
+from search import note_filter
+
+
+ROLLUP_CATEGORY_JOIN = Category.id == MonthlySummary.category_id
+
+
+def filter_transactions(query, user_id, start_date=None, end_date=None, search_note=None, model=Transaction,
+                        paged=False):
+    """Restrict a Transaction query to a user's rows in the dashboard's date range and note filters.
+
+    The note filter goes through the indexed word search (see search.py),
+    so every word of ``search_note`` must start a word of the note. It
+    brings its own user_id condition, so ``query`` must not already filter
+    on user_id; ``paged`` is passed on to note_filter(). Pass
+    ``model=ArchivedTransaction`` to filter a query on the archive.
+    """
+    criterion = note_filter(user_id, search_note, model, paged) if search_note else None
+    query = query.filter(model.user_id == user_id if criterion is None else criterion)
+    if start_date:
+        query = query.filter(model.timestamp >= start_date)
+    if end_date:
+        query = query.filter(model.timestamp <= end_date)
+    return query
+
+
+def ledger_queries(user_id, start_date=None, end_date=None, search_note=None):
+    """Filtered queries on a user's live and archived transactions, for paginate_transactions()."""
+    return [
+        filter_transactions(model.query, user_id, start_date, end_date, search_note, model, paged=True)
+        for model in (Transaction, ArchivedTransaction)
+    ]
+
+
+def ledger_rows(user_id, start_date=None, end_date=None, search_note=None):
+    """A user's live and archived transactions as one filtered subquery.
+
+    Columns are id, amount, category_id, note and timestamp. Each table is
+    filtered on its own indexes before the UNION ALL, so a recent date
+    range costs the archive a single empty index range.
+    """
+    branches = [
+        filter_transactions(
+            select(model.id, model.amount, model.category_id, model.note, model.timestamp),
+            user_id, start_date, end_date, search_note, model
+        )
+        for model in (Transaction, ArchivedTransaction)
+    ]
+    return union_all(*branches).subquery('ledger')
+
+
+def category_totals(user_id, start_date=None, end_date=None, search_note=None):
+    """Per-category totals for a user, largest first.
+
+    Returns a list of dicts with id, name, type, color and total. Unfiltered
+    totals are read from the MonthlySummary rollup, filtered ones from
+    ledger_rows() so they include archived transactions.
+    """
+    if not (start_date or end_date or search_note):
+        total = func.sum(MonthlySummary.total).label('total')
+        rows = (
+            db.session.query(Category.id, Category.name, Category.type, Category.color, total)
+            .join(Category, ROLLUP_CATEGORY_JOIN)
+            .filter(MonthlySummary.user_id == user_id)
+            .group_by(Category.id, Category.name, Category.type, Category.color)
+            .order_by(total.desc())
+            .all()
+        )
+    else:
+        ledger = ledger_rows(user_id, start_date, end_date, search_note)
+        total = func.sum(ledger.c.amount).label('total')
+        rows = (
+            db.session.query(Category.id, Category.name, Category.type, Category.color, total)
+            .select_from(ledger)
+            .join(Category, Category.id == ledger.c.category_id)
+            .group_by(Category.id, Category.name, Category.type, Category.color)
+            .order_by(total.desc())
+            .all()
+        )
+
+    return [
+        {'id': row.id, 'name': row.name, 'type': row.type, 'color': row.color, 'total': row.total}
+        for row in rows
+    ]
+
+
+def monthly_totals(user_id, start_date=None, end_date=None, search_note=None, limit=None):
+    """Income, expense and balance per calendar month, oldest first.
+
+    With ``limit`` only the most recent ``limit`` months are returned.
+    Unfiltered rows are read from the MonthlySummary rollup, filtered ones
+    from ledger_rows().
+    """
+    if not (start_date or end_date or search_note):
+        query = (
+            db.session.query(
+                MonthlySummary.year,
+                MonthlySummary.month,
+                func.sum(case((Category.type == 'Income', MonthlySummary.total), else_=0)).label('income'),
+                func.sum(case((Category.type == 'Expense', MonthlySummary.total), else_=0)).label('expense'),
+            )
+            .outerjoin(Category, ROLLUP_CATEGORY_JOIN)
+            .filter(MonthlySummary.user_id == user_id)
+            .group_by(MonthlySummary.year, MonthlySummary.month)
+        )
+    else:
+        ledger = ledger_rows(user_id, start_date, end_date, search_note)
+        query = (
+            db.session.query(
+                extract('year', ledger.c.timestamp).label('year'),
+                extract('month', ledger.c.timestamp).label('month'),
+                func.sum(case((Category.type == 'Income', ledger.c.amount), else_=0)).label('income'),
+                func.sum(case((Category.type == 'Expense', ledger.c.amount), else_=0)).label('expense'),
+            )
+            .select_from(ledger)
+            .outerjoin(Category, Category.id == ledger.c.category_id)
+            .group_by('year', 'month')
+        )
+
+    if limit:
+        rows = query.order_by(desc('year'), desc('month')).limit(limit).all()[::-1]
+    else:
+        rows = query.order_by('year', 'month').all()
+
+    return [
+        {
+            'year': int(row.year),
+            'month': int(row.month),
+            'income': row.income,
+            'expense': row.expense,
+            'balance': row.income - row.expense
+        }
+        for row in rows
+    ]
+
+
+def ledger_summary(user_id, start_date=None, end_date=None, search_note=None, top_n=5):
+    """Totals, top expense categories and monthly rows for a user.
+
+    Everything comes from two grouped queries, so no Transaction rows are
+    loaded into Python regardless of how long the user's history is.
+    Without filters both queries only read the MonthlySummary rollup.
+    """
+    by_category = category_totals(user_id, start_date, end_date, search_note)
+
+    income = sum((c['total'] for c in by_category if c['type'] == 'Income'), Decimal('0.00'))
+    expense = sum((c['total'] for c in by_category if c['type'] == 'Expense'), Decimal('0.00'))
+
+    return {
+        'income': income,
+        'expense': expense,
+        'balance': income - expense,
+        'categories': by_category,
+        'top_expenses': [c for c in by_category if c['type'] == 'Expense'][:top_n],
+        'monthly': monthly_totals(user_id, start_date, end_date, search_note)
+    }
+
+
+def budget_progress(user_id, year, month):
+    """Spending against each of a user's budgets for one month.
+
+    Spending comes from the MonthlySummary bucket matching each budget, so
+    the whole page costs one query no matter how many budgets there are.
+    """
+    rows = (
+        db.session.query(Budget, MonthlySummary.total)
+        .join(Budget.category)
+        .outerjoin(MonthlySummary, and_(
+            MonthlySummary.user_id == Budget.user_id,
+            MonthlySummary.year == Budget.year,
+            MonthlySummary.month == Budget.month,
+            MonthlySummary.category_id == Budget.category_id
+        ))
+        .options(contains_eager(Budget.category))
+        .filter(Budget.user_id == user_id, Budget.year == year, Budget.month == month)
+        .order_by(Category.name)
+        .all()
+    )
+
+    progress = []
+    for budget, spent in rows:
+        spent = spent or Decimal('0.00')
+        percentage = float(spent / budget.amount * 100) if budget.amount > 0 else 0.0
+        progress.append({
+            'budget': budget,
+            'spent': spent,
+            'remaining': budget.amount - spent,
+            'percentage': min(percentage, 100),
+            'overspent': spent > budget.amount
+        })
+    return progress
+
+
+def spending_insights(income, expense, top_expenses, monthly):
+    """Savings rate, monthly averages and the 3-month spending trend for the dashboard.
+
+    Amounts stay Decimal, with averages rounded to the minor unit; rates
+    and percentages are floats.
+    """
+    months = len(monthly)
+    insights = {
+        'savings_rate': float((income - expense) / income * 100) if income > 0 else 0.0,
+        'avg_monthly_income': money(income / max(months, 1)),
+        'avg_monthly_expense': money(expense / max(months, 1)),
+        'highest_expense_category': top_expenses[0]['name'] if top_expenses else None,
+        'highest_expense_amount': top_expenses[0]['total'] if top_expenses else Decimal('0.00'),
+        'total_months': months,
+        'is_overspending': expense > income,
+        'monthly_surplus': money((income - expense) / months) if months > 0 else Decimal('0.00')
+    }
+
+    # Spending trends (last 3 months vs previous 3 months)
+    if months >= 6:
+        recent_avg_expense = sum(m['expense'] for m in monthly[-3:]) / 3
+        previous_avg_expense = sum(m['expense'] for m in monthly[-6:-3]) / 3
+
+        insights['spending_trend'] = 'increasing' if recent_avg_expense > previous_avg_expense else 'decreasing'
+        insights['trend_percentage'] = float(abs((recent_avg_expense - previous_avg_expense) / previous_avg_expense * 100)) if previous_avg_expense > 0 else 0.0
+    else:
+        insights['spending_trend'] = 'stable'
+        insights['trend_percentage'] = 0.0
+    return insights
+
+
+def dashboard_summary(user_id, start_date=None, end_date=None, search_note=None, trend_months=12):
+    """Everything the dashboard shows besides the transaction list, from one shared computation.
+
+    The breakdown chart, trend chart and insights are all derived from the
+    two ledger_summary() queries, and budget status from one more, instead
+    of each chart re-aggregating on its own request.
+    """
+    summary = ledger_summary(user_id, start_date, end_date, search_note)
+    expenses = [c for c in summary['categories'] if c['type'] == 'Expense']
+    trend = summary['monthly'][-trend_months:]
+
+    now = datetime.now()
+    summary.update({
+        'breakdown': {
+            'labels': [c['name'] for c in expenses],
+            'data': [c['total'] for c in expenses],
+            'colors': [c['color'] or '#6c757d' for c in expenses]
+        },
+        'trend': {
+            'labels': [datetime(m['year'], m['month'], 1).strftime('%b %Y') for m in trend],
+            'income': [m['income'] for m in trend],
+            'expense': [m['expense'] for m in trend]
+        },
+        'insights': spending_insights(summary['income'], summary['expense'], summary['top_expenses'], summary['monthly']),
+        'budgets': budget_progress(user_id, now.year, now.month)
+    })
+    return summary
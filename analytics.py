@@ -0,0 +1,204 @@
+"""Vectorized spending analytics on top of the MonthlySummary rollup.
+
+A user's rollup is loaded once into a categories x months NumPy matrix;
+every statistic below is then computed with array operations over all
+categories at once, so the cost depends on the length of the history
+only through a handful of vector passes. The matrix holds integer minor
+units, so totals are summed exactly; only the statistics use floats.
+"""
+import calendar
+from datetime import datetime
+
+import numpy as np
+
+from models import db, Category, Budget, MonthlySummary, MINOR_UNIT
+
+MINOR_UNITS = int(1 / MINOR_UNIT)  # per currency unit, as stored by models.Money
+
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+
+class LedgerMatrix:
+    """Monthly totals as a dense int64 ``totals[category, month]`` array of minor units.
+
+    ``months`` is a contiguous run of month indexes (see month_index())
+    ending at the current month, so empty months are explicit zeros.
+    """
+
+    def __init__(self, categories, months, totals):
+        self.categories = categories
+        self.months = months
+        self.totals = totals
+
+    @classmethod
+    def from_rows(cls, categories, rows, end):
+        """Build from (category_id, year, month, minor units) rows, up to month index ``end``."""
+        # Converting to plain tuples first is much faster than NumPy reading Row objects
+        rows = np.array([tuple(row) for row in rows], dtype=np.int64).reshape(-1, 4)
+        index = rows[:, 1].astype(int) * 12 + rows[:, 2].astype(int) - 1
+        start = int(index.min()) if len(index) else end
+        months = np.arange(start, end + 1)
+
+        totals = np.zeros((len(categories), len(months)), dtype=np.int64)
+        if not categories:
+            return cls(categories, months, totals)
+
+        # Map category ids to matrix rows with a sorted lookup instead of a per-row dict
+        ids = np.array([c['id'] for c in categories], dtype=int)
+        order = np.argsort(ids)
+        row_ids = rows[:, 0]
+        found = order[np.searchsorted(ids[order], row_ids).clip(0, len(ids) - 1)]
+        keep = (index <= end) & (ids[found] == row_ids)
+        np.add.at(totals, (found[keep], index[keep] - start), rows[keep, 3])
+        return cls(categories, months, totals)
+
+    @property
+    def is_expense(self):
+        return np.array([c['type'] == 'Expense' for c in self.categories], dtype=bool)
+
+    @property
+    def amounts(self):
+        """``totals`` in currency units, as floats for the statistics."""
+        return self.totals / MINOR_UNITS
+
+    def monthly(self):
+        """(income, expense) per month as two 1-D arrays in currency units, summed in minor units."""
+        expense_mask = self.is_expense
+        return (
+            self.totals[~expense_mask].sum(axis=0) / MINOR_UNITS,
+            self.totals[expense_mask].sum(axis=0) / MINOR_UNITS
+        )
+
+
+def load_matrix(user_id, today=None):
+    today = today or datetime.now()
+    categories = [
+        {'id': c.id, 'name': c.name, 'type': c.type, 'color': c.color or '#6c757d'}
+        for c in Category.query.filter_by(user_id=user_id).order_by(Category.id)
+    ]
+    rows = db.session.query(
+        MonthlySummary.category_id, MonthlySummary.year, MonthlySummary.month,
+        db.type_coerce(MonthlySummary.total, db.BigInteger)  # raw minor units, no Decimal per row
+    ).filter(MonthlySummary.user_id == user_id).all()
+    return LedgerMatrix.from_rows(categories, rows, month_index(today.year, today.month))
+
+
+def rolling_mean(series, window):
+    """Trailing mean over ``window`` points; shorter at the start of the series."""
+    sums = np.cumsum(np.insert(series, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(series) + 1), window)
+    return (sums[1:] - sums[np.maximum(np.arange(1, len(series) + 1) - window, 0)]) / counts
+
+
+def category_trends(matrix, window=6):
+    """Least-squares slope of each category over the last ``window`` complete months.
+
+    Returns the slope per month and that slope as a percentage of the
+    category's mean over the window (0 when the mean is 0).
+    """
+    recent = matrix.amounts[:, -window - 1:-1]
+    if recent.shape[1] < 2:
+        zeros = np.zeros(len(matrix.categories))
+        return zeros, zeros
+    x = np.arange(recent.shape[1]) - (recent.shape[1] - 1) / 2
+    slope = recent @ x / (x @ x)
+    mean = recent.mean(axis=1)
+    percent = np.divide(slope * 100, mean, out=np.zeros_like(slope), where=mean > 0)
+    return slope, percent
+
+
+def spending_anomalies(matrix, window=12, threshold=2.0):
+    """Z-score of the last complete month against the ``window`` months before it.
+
+    Returns (z_scores, flags); only expense categories with enough history
+    and spending above their usual level are flagged.
+    """
+    if matrix.totals.shape[1] < 3:
+        zeros = np.zeros(len(matrix.categories))
+        return zeros, zeros.astype(bool)
+
+    amounts = matrix.amounts
+    history = amounts[:, -window - 2:-2]
+    latest = amounts[:, -2]
+    mean = history.mean(axis=1)
+    std = history.std(axis=1)
+    z = np.divide(latest - mean, std, out=np.zeros_like(latest), where=std > 0)
+    flags = matrix.is_expense & (z > threshold) & (history.shape[1] >= 3)
+    return z, flags
+
+
+def budget_forecasts(matrix, budgets, today=None, window=6):
+    """Projected month-end spend for each of this month's budgets.
+
+    The rest of the month is extrapolated at a monthly rate that blends the
+    month-to-date pace with the category's recent average, weighting the
+    pace more as the month goes on.
+    """
+    today = today or datetime.now()
+    if not budgets:
+        return []
+
+    days = calendar.monthrange(today.year, today.month)[1]
+    elapsed = today.day / days
+    positions = {c['id']: i for i, c in enumerate(matrix.categories)}
+    rows = np.array([positions.get(b.category_id, -1) for b in budgets])
+    known = rows >= 0
+
+    amounts = matrix.amounts
+    spent = np.where(known, amounts[rows, -1], 0.0)
+    history = amounts[rows, -window - 1:-1]
+    average = np.where(known, history.mean(axis=1) if history.shape[1] else 0.0, 0.0)
+    pace = spent / elapsed
+    rate = elapsed * pace + (1 - elapsed) * np.where(average > 0, average, pace)
+    projected = spent + (1 - elapsed) * rate
+    limits = np.array([float(b.amount) for b in budgets])
+
+    return [
+        {
+            'budget_id': budget.id,
+            'category_id': budget.category_id,
+            'category': matrix.categories[row]['name'] if row >= 0 else None,
+            'amount': float(limit),
+            'spent': float(s),
+            'projected': float(p),
+            'will_exceed': bool(p > limit),
+        }
+        for budget, row, limit, s, p in zip(budgets, rows, limits, spent, projected)
+    ]
+
+
+def analytics_summary(user_id, today=None):
+    """Rolling averages, category trends, anomalies and budget forecasts for a user."""
+    today = today or datetime.now()
+    matrix = load_matrix(user_id, today)
+    budgets = Budget.query.filter_by(user_id=user_id, year=today.year, month=today.month).all()
+    return summarize(matrix, budgets, today)
+
+
+def summarize(matrix, budgets, today):
+    """JSON-ready analytics for an already loaded LedgerMatrix."""
+    income, expense = matrix.monthly()
+    slope, trend_percent = category_trends(matrix)
+    z, flags = spending_anomalies(matrix)
+    labels = [datetime(int(m) // 12, int(m) % 12 + 1, 1).strftime('%b %Y') for m in matrix.months[-12:]]
+
+    return {
+        'months': labels,
+        'expense': expense[-12:].tolist(),
+        'income': income[-12:].tolist(),
+        'rolling_expense': {
+            str(window): rolling_mean(expense, window)[-12:].tolist() for window in (3, 6, 12)
+        },
+        'category_trends': [
+            {'category_id': c['id'], 'category': c['name'], 'slope': float(s), 'percent': float(p)}
+            for c, s, p in zip(matrix.categories, slope, trend_percent)
+            if c['type'] == 'Expense' and s != 0
+        ],
+        'anomalies': [
+            {'category_id': c['id'], 'category': c['name'], 'amount': matrix.totals[i, -2] / MINOR_UNITS, 'z_score': float(z[i])}
+            for i, c in enumerate(matrix.categories) if flags[i]
+        ],
+        'budget_forecasts': budget_forecasts(matrix, budgets, today),
+    }
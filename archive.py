@@ -0,0 +1,149 @@
+"""Archival of closed periods.
+
+``flask archive-transactions`` (monthly from cron) moves every transaction
+dated before the month ARCHIVE_AFTER_MONTHS back from the current one
+into ArchivedTransaction, so the live table and its indexes only grow
+with the recent history that the dashboard, budgets and edits work on.
+
+Rows keep their ids and move ``batch_size`` at a time, each batch
+committing its insert and delete together, so readers see every row in
+exactly one table. Ids are never reused: Transaction is AUTOINCREMENT on
+SQLite and MySQL 8 or later persists the auto-increment counter, so an
+archived id cannot come back as a new live row. Recurring templates and
+rows a live transaction still points at through recurring_source_id
+stay live. The MonthlySummary buckets of the archived months are recomputed
+from their rows afterwards, so the rollup is exact for everything in
+the archive.
+
+Archived transactions cannot be edited or deleted; the transaction list,
+the CSV and PDF exports, note search and filtered totals read both
+tables (see aggregates.ledger_queries() and ledger_rows()). A transaction added later with a date in an
+archived month stays live until the next run moves it. On MySQL the
+archive is RANGE partitioned by year: each year is split off the
+catch-all partition before rows are moved into it.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import literal, select, text
+
+from models import db, User, Transaction, ArchivedTransaction, NoteToken, ArchivedNoteToken, index_note_tokens
+from rollups import rebuild_rollups
+
+ARCHIVED_COLUMNS = ['id', 'timestamp', 'user_id', 'amount', 'category_id', 'note', 'content_hash', 'recurring_source_id']
+
+
+def archive_horizon(months, today=None):
+    """First day of the month ``months`` before the current one; everything earlier is archived."""
+    today = today or datetime.utcnow()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return datetime(year, month + 1, 1)
+
+
+def _partition_years():
+    """Years that already have their own archive partition, or None if the table is not partitioned."""
+    names = db.session.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transaction_archive'"
+    )).scalars().all()
+    if 'p_future' not in names:
+        return None
+    return {int(name[1:]) for name in names if name != 'p_future'}
+
+
+def ensure_partitions(years):
+    """Split a partition off p_future for each of ``years`` above the highest one so far (MySQL only).
+
+    Years below the highest partition already fall into an existing one,
+    so rows are never left in p_future and splitting it moves no data.
+    """
+    if db.engine.dialect.name != 'mysql':
+        return []
+    existing = _partition_years()
+    if existing is None:
+        return []
+
+    added = []
+    top = max(existing, default=None)
+    for year in sorted(years):
+        if top is not None and year <= top:
+            continue
+        # DDL commits implicitly, so this runs before the batch that needs it
+        db.session.execute(text(
+            f"ALTER TABLE transaction_archive REORGANIZE PARTITION p_future INTO ("
+            f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01'), "
+            f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+        ))
+        added.append(year)
+        top = year
+    return added
+
+
+def _archivable(user_id, before):
+    """(id, timestamp) of a user's transactions that may move to the archive, oldest first."""
+    referenced = select(Transaction.recurring_source_id).where(
+        Transaction.user_id == user_id,
+        Transaction.recurring_source_id.isnot(None)
+    )
+    return (
+        select(Transaction.id, Transaction.timestamp)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.timestamp < before,
+            Transaction.is_recurring.isnot(True),
+            Transaction.id.notin_(referenced)
+        )
+        .order_by(Transaction.timestamp, Transaction.id)
+    )
+
+
+def archive_user(user_id, before, batch_size=1000):
+    """Move a user's transactions dated before ``before`` to the archive. Returns how many moved."""
+    moved = 0
+    oldest = None
+    while True:
+        rows = db.session.execute(_archivable(user_id, before).limit(batch_size)).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        first = min(row.timestamp for row in rows)
+        oldest = first if oldest is None else min(oldest, first)
+
+        ensure_partitions({row.timestamp.year for row in rows})
+        db.session.execute(
+            db.insert(ArchivedTransaction).from_select(
+                [getattr(ArchivedTransaction, name) for name in ARCHIVED_COLUMNS + ['archived_at']],
+                select(*(getattr(Transaction, name) for name in ARCHIVED_COLUMNS), literal(datetime.utcnow()))
+                .where(Transaction.id.in_(ids))
+            )
+        )
+        index_note_tokens(db.session, ids, model=ArchivedTransaction, token_model=ArchivedNoteToken)
+        db.session.execute(db.delete(NoteToken).where(NoteToken.transaction_id.in_(ids)))
+        db.session.execute(db.delete(Transaction).where(Transaction.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+
+    if moved:
+        # Settle the archived months from their rows, undoing any drift of the incremental updates
+        rebuild_rollups(user_id, start=datetime(oldest.year, oldest.month, 1), end=before)
+        db.session.commit()
+    return moved
+
+
+def archive_closed_periods(months=None, batch_size=None, today=None):
+    """Archive every user's transactions older than ``months`` (default ARCHIVE_AFTER_MONTHS).
+
+    Returns a summary dict with the horizon and the number of users and
+    transactions archived.
+    """
+    months = months if months is not None else current_app.config['ARCHIVE_AFTER_MONTHS']
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    before = archive_horizon(months, today)
+
+    result = {'before': before, 'users': 0, 'archived': 0}
+    for user_id in db.session.execute(select(User.id).order_by(User.id)).scalars().all():
+        moved = archive_user(user_id, before, batch_size)
+        if moved:
+            result['users'] += 1
+            result['archived'] += moved
+    return result
@@ -0,0 +1,153 @@
+from datetime import datetime, timezone
+
+from models import db, User, Transaction, Category, MAX_AMOUNT, RECURRENCE_RULES, validate_amount
+from rollups import accumulate, apply_buckets
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class BatchError(ValueError):
+    """The batch request itself is malformed, so no operation was attempted."""
+
+
+class OperationError(ValueError):
+    """A single operation is invalid; reported in its result without stopping the batch."""
+
+
+def _parse_fields(item, categories, partial):
+    """Validate the transaction fields of a create/update item into model attribute values."""
+    fields = {}
+
+    if 'amount' in item or not partial:
+        try:
+            amount = validate_amount(item.get('amount'))
+        except ValueError:
+            raise OperationError(f'amount must be a number no larger than {MAX_AMOUNT}')
+        if amount <= 0:
+            raise OperationError('amount must be greater than zero')
+        fields['amount'] = amount
+
+    if 'category_id' in item or not partial:
+        category_id = item.get('category_id')
+        category = categories.get(category_id) if isinstance(category_id, int) else None
+        if category is None:
+            raise OperationError('unknown category_id')
+        fields['category_id'] = category.id
+
+    if 'note' in item or not partial:
+        note = item.get('note') or ''
+        if not isinstance(note, str):
+            raise OperationError('note must be a string')
+        fields['note'] = note.strip()[:200]
+
+    if 'timestamp' in item:
+        try:
+            timestamp = datetime.fromisoformat(item['timestamp'])
+            if timestamp.tzinfo is not None:
+                # Stored naive in UTC, like datetime.utcnow()
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+            fields['timestamp'] = timestamp
+        except (TypeError, ValueError, OverflowError):
+            raise OperationError('timestamp must be an ISO 8601 date-time')
+
+    if 'is_recurring' in item or not partial:
+        fields['is_recurring'] = bool(item.get('is_recurring', False))
+    if 'recurrence_type' in item or 'is_recurring' in fields:
+        recurrence_type = item.get('recurrence_type')
+        if recurrence_type is not None and recurrence_type not in RECURRENCE_RULES:
+            raise OperationError(f"recurrence_type must be one of {', '.join(RECURRENCE_RULES)}")
+        fields['recurrence_type'] = recurrence_type
+
+    return fields
+
+
+def apply_batch(user_id, operations, atomic=False):
+    """Apply a list of create/update/delete operations for a user in one DB transaction.
+
+    Every operation is validated first against categories and transactions
+    loaded with one query each. Valid operations are then written together,
+    with one rollup update per month/category and a single data-version bump
+    and commit. Invalid operations are reported in their result and skipped,
+    unless ``atomic`` is set, in which case nothing is written.
+
+    Returns ``(results, applied)``: one result dict per operation, in order,
+    and whether the valid operations were committed.
+    """
+    if not isinstance(operations, list):
+        raise BatchError('operations must be a list')
+
+    categories = {c.id: c for c in Category.query.filter_by(user_id=user_id)}
+    ids = {
+        item.get('id') for item in operations
+        if isinstance(item, dict) and item.get('op') in ('update', 'delete') and isinstance(item.get('id'), int)
+    }
+    existing = {
+        t.id: t for t in Transaction.query.filter(Transaction.user_id == user_id, Transaction.id.in_(ids))
+    } if ids else {}
+
+    results = []
+    planned = []
+    touched = set()
+    for index, item in enumerate(operations):
+        result = {'index': index}
+        if isinstance(item, dict) and 'ref' in item:
+            result['ref'] = item['ref']  # lets clients match results to their local records
+        try:
+            if not isinstance(item, dict) or item.get('op') not in OPERATIONS:
+                raise OperationError(f"op must be one of {', '.join(OPERATIONS)}")
+            op = item['op']
+            result['op'] = op
+
+            if op == 'create':
+                planned.append((result, op, None, _parse_fields(item, categories, partial=False)))
+            else:
+                txn = existing.get(item.get('id')) if isinstance(item.get('id'), int) else None
+                if txn is None or txn.id in touched:
+                    raise OperationError('transaction not found' if txn is None else 'transaction already used in this batch')
+                touched.add(txn.id)
+                fields = _parse_fields(item, categories, partial=True) if op == 'update' else None
+                planned.append((result, op, txn, fields))
+            result['status'] = 'ok'
+        except OperationError as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+        results.append(result)
+
+    failed = any(r['status'] == 'error' for r in results)
+    if not planned or (atomic and failed):
+        if atomic and failed:
+            for result in results:
+                if result['status'] == 'ok':
+                    result['status'] = 'skipped'
+        return results, False
+
+    buckets = {}
+    created = []
+    for result, op, txn, fields in planned:
+        if op == 'create':
+            txn = Transaction(user_id=user_id, **fields)
+            if txn.timestamp is None:
+                txn.timestamp = datetime.utcnow()
+            db.session.add(txn)
+            created.append((result, txn))
+        else:
+            accumulate(buckets, txn.timestamp, txn.category_id, -txn.amount, -1)
+            if op == 'delete':
+                db.session.delete(txn)
+                result['id'] = txn.id
+                continue
+            for name, value in fields.items():
+                setattr(txn, name, value)
+            result['id'] = txn.id
+        if not txn.is_recurring:
+            txn.recurrence_type = None
+        accumulate(buckets, txn.timestamp, txn.category_id, txn.amount)
+
+    db.session.flush()
+    for result, txn in created:
+        result['id'] = txn.id
+
+    apply_buckets(user_id, buckets)
+    User.bump_data_version(user_id)
+    db.session.commit()
+    return results, True
@@ -0,0 +1,106 @@
+"""Dashboard aggregation benchmark.
+
+Compares the old approach (load every Transaction and sum in Python) with
+aggregates.ledger_summary as history grows: unfiltered (read from the
+MonthlySummary rollup) and date-filtered (grouped SQL over Transaction).
+
+    python benchmarks/bench_aggregates.py [--sizes 1000,10000,100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from models import db, User, Transaction, Category
+from aggregates import ledger_summary
+from rollups import rebuild_rollups
+
+CATEGORIES = [
+    ('Salary', 'Income'), ('Freelance', 'Income'),
+    ('Food', 'Expense'), ('Transport', 'Expense'), ('Shopping', 'Expense'),
+    ('Bills', 'Expense'), ('Entertainment', 'Expense'), ('Other', 'Expense'),
+]
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def seed(user_id, category_ids, count, rng):
+    start = datetime.utcnow() - timedelta(days=365 * 5)
+    rows = [
+        {
+            'user_id': user_id,
+            'amount': round(rng.uniform(1, 5000), 2),
+            'category_id': rng.choice(category_ids),
+            'note': f"note {i}",
+            'timestamp': start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5)),
+        }
+        for i in range(count)
+    ]
+    db.session.execute(db.insert(Transaction), rows)
+    rebuild_rollups(user_id)
+    db.session.commit()
+
+
+def legacy_summary(user_id):
+    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.timestamp.desc()).all()
+    category_types = {c.id: c.type for c in Category.query.filter_by(user_id=user_id).all()}
+    income = sum(t.amount for t in transactions if category_types.get(t.category_id) == "Income")
+    expense = sum(t.amount for t in transactions if category_types.get(t.category_id) == "Expense")
+    return income, expense
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'rows':>10} {'legacy ms':>12} {'rollup ms':>10} {'filtered ms':>12}")
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+                user = User(email='bench@example.com', password='x')
+                db.session.add(user)
+                db.session.commit()
+                for name, cat_type in CATEGORIES:
+                    db.session.add(Category(name=name, type=cat_type, user_id=user.id))
+                db.session.commit()
+                category_ids = [c.id for c in Category.query.filter_by(user_id=user.id)]
+                seed(user.id, category_ids, size, rng)
+
+                legacy_ms = timed(lambda: legacy_summary(user.id), args.repeat)
+                rollup_ms = timed(lambda: ledger_summary(user.id), args.repeat)
+                filtered_ms = timed(lambda: ledger_summary(user.id, start_date='2000-01-01'), args.repeat)
+                db.session.remove()
+                db.engine.dispose()
+
+        print(f"{size:>10} {legacy_ms:>12.1f} {rollup_ms:>10.1f} {filtered_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
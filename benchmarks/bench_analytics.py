@@ -0,0 +1,97 @@
+"""Analytics engine benchmark.
+
+Seeds a MonthlySummary rollup covering ``--years`` of history for a user
+with ``--categories`` categories and one budget per expense category, then
+times analytics.analytics_summary end to end (rollup query included) and
+the NumPy part on its own.
+
+    python benchmarks/bench_analytics.py [--years 10] [--categories 8,40,200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from models import db, User, Category, Budget, MonthlySummary
+from analytics import analytics_summary, load_matrix, summarize
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def seed(user_id, categories, years, today, rng):
+    for i in range(categories):
+        db.session.add(Category(name=f"Category {i}", type='Income' if i % 5 == 0 else 'Expense', user_id=user_id))
+    db.session.commit()
+
+    rows = []
+    for category in Category.query.filter_by(user_id=user_id):
+        base = rng.uniform(100, 5000)
+        for k in range(years * 12):
+            year, month = divmod(today.year * 12 + today.month - 1 - k, 12)
+            rows.append({
+                'user_id': user_id, 'year': year, 'month': month + 1, 'category_id': category.id,
+                'total': round(base * rng.uniform(0.7, 1.3), 2), 'count': rng.randint(1, 60),
+            })
+        if category.type == 'Expense':
+            db.session.add(Budget(user_id=user_id, category_id=category.id, amount=base,
+                                  month=today.month, year=today.year))
+    db.session.execute(db.insert(MonthlySummary), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--categories', default='8,40,200')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    today = datetime.now()
+    print(f"{'categories':>10} {'rollup rows':>12} {'end-to-end ms':>14} {'numpy ms':>9}")
+
+    for categories in (int(c) for c in args.categories.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+                user = User(email='bench@example.com', password='x')
+                db.session.add(user)
+                db.session.commit()
+                rows = seed(user.id, categories, args.years, today, rng)
+
+                matrix = load_matrix(user.id, today)
+                budgets = Budget.query.filter_by(user_id=user.id, year=today.year, month=today.month).all()
+
+                total_ms = timed(lambda: analytics_summary(user.id, today), args.repeat)
+                numpy_ms = timed(lambda: summarize(matrix, budgets, today), args.repeat)
+                db.session.remove()
+                db.engine.dispose()
+
+        print(f"{categories:>10} {rows:>12} {total_ms:>14.1f} {numpy_ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
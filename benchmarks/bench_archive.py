@@ -0,0 +1,147 @@
+"""Archival benchmark: recent-history queries before and after archiving.
+
+Generates a long ledger, runs the queries the dashboard and API make
+against recent months, then archives everything older than --keep-months
+(archive.archive_closed_periods) and runs them again. Also checks that
+archival is invisible to readers: the CSV export, note search, filtered
+and unfiltered totals and the MonthlySummary rollup must be the same
+before and after, and /api/sync must return an archived row that a
+client already synced as an upsert, never as a tombstone.
+
+    python benchmarks/bench_archive.py [--transactions 100000] [--months 120] [--keep-months 24]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{os.path.join(tmp_dir, 'archive.db')}")
+os.environ.setdefault('CHART_CACHE_BACKEND', 'none')
+os.environ.setdefault('RATELIMIT_BACKEND', 'none')
+os.environ.setdefault('MAIL_OUTBOX_SENDER', 'False')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from models import db, Transaction, ArchivedTransaction, MonthlySummary
+from rollups import add_to_rollup
+from sync import changes_since, current_cursor
+from aggregates import category_totals, ledger_queries, ledger_summary, monthly_totals
+from archive import archive_closed_periods, archive_horizon
+from exports import iter_csv
+from search import search_transactions
+from views.common import paginate_transactions
+from datagen import generate_ledger
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def workloads(user_id, recent):
+    return {
+        'first page': lambda: paginate_transactions(ledger_queries(user_id), per_page=50),
+        'totals, last 3 months': lambda: category_totals(user_id, start_date=recent),
+        'monthly, last 3 months': lambda: monthly_totals(user_id, start_date=recent),
+        'search "coffee"': lambda: search_transactions(user_id, 'coffee', limit=50),
+        'CSV export, last 3 months': lambda: b''.join(iter_csv(user_id, start_date=recent)),
+    }
+
+
+def snapshot(user_id):
+    """Everything a reader can see of the ledger, to compare across archival."""
+    rollup = db.session.query(
+        MonthlySummary.year, MonthlySummary.month, MonthlySummary.category_id, MonthlySummary.total, MonthlySummary.count
+    ).filter(MonthlySummary.user_id == user_id).order_by(
+        MonthlySummary.year, MonthlySummary.month, MonthlySummary.category_id
+    ).all()
+    return {
+        'CSV export': b''.join(iter_csv(user_id)),
+        'note search': sorted(txn.id for txn, _ in search_transactions(user_id, 'coffee', limit=100000)),
+        'filtered totals': [(c['id'], round(c['total'], 2)) for c in category_totals(user_id, search_note='coffee')],
+        'filtered months': [
+            (m['year'], m['month'], round(m['income'], 2), round(m['expense'], 2))
+            for m in monthly_totals(user_id, start_date='2000-01-01')
+        ],
+        'summary': round(ledger_summary(user_id)['balance'], 2),
+        'rollup': [(y, m, c, round(t, 2), n) for y, m, c, t, n in rollup],
+    }
+
+
+def add_synced_row(user_id, months):
+    """Add an old transaction through the ORM, so the change log records it, after a sync cursor.
+
+    Returns (cursor, transaction id).
+    """
+    cursor = current_cursor(user_id)
+    txn = Transaction(
+        user_id=user_id,
+        category_id=Transaction.query.filter_by(user_id=user_id).first().category_id,
+        amount=12.5,
+        note='synced before archival',
+        timestamp=archive_horizon(months + 12)
+    )
+    db.session.add(txn)
+    db.session.flush()
+    add_to_rollup(txn)
+    db.session.commit()
+    return cursor, txn.id
+
+
+def sync_check(user_id, cursor, txn_id):
+    changes = changes_since(user_id, cursor, limit=100000)
+    upserted = txn_id in {obj.id for obj in changes['upserts']['transaction']}
+    tombstoned = txn_id in changes['deleted']['transaction']
+    return 'same' if upserted and not tombstoned else 'DIFFERENT'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--months', type=int, default=120, help='History length.')
+    parser.add_argument('--keep-months', type=int, default=24, help='Months left in the live table.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        (user_id, _), = generate_ledger(users=1, transactions=args.transactions, months=args.months)
+        sync_cursor, synced_id = add_synced_row(user_id, args.keep_months)
+        recent = archive_horizon(3).strftime('%Y-%m-%d')
+        queries = workloads(user_id, recent)
+
+        before = {name: timed(fn, args.repeat) for name, fn in queries.items()}
+        expected = snapshot(user_id)
+
+        started = time.perf_counter()
+        result = archive_closed_periods(args.keep_months)
+        elapsed = time.perf_counter() - started
+        print(
+            f"Archived {result['archived']} of {args.transactions} transactions before "
+            f"{result['before']:%Y-%m-%d} in {elapsed:.1f} s; "
+            f"{Transaction.query.count()} live, {ArchivedTransaction.query.count()} archived."
+        )
+
+        after = {name: timed(fn, args.repeat) for name, fn in queries.items()}
+        actual = snapshot(user_id)
+
+        print(f"\n{'query':<28} {'before ms':>10} {'after ms':>10}")
+        for name in queries:
+            print(f"{name:<28} {before[name]:>10.1f} {after[name]:>10.1f}")
+
+        print()
+        for name, value in expected.items():
+            print(f"{name:<28} {'same' if actual[name] == value else 'DIFFERENT'}")
+        print(f"{'sync of an archived row':<28} {sync_check(user_id, sync_cursor, synced_id)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Login throughput under contention.
+
+``--clients`` threads verify passwords back to back for ``--seconds`` while
+a probe thread repeats a small fixed piece of CPU work, standing in for
+dashboard requests competing for the same CPUs. This runs twice:
+first with check_password_hash inline in each thread (the old login path),
+then through passwords.py's pool with ``--workers`` hashing threads. It
+prints login throughput and latency and the probe's throughput and
+latency, then times
+the in-memory rate limiter on its own.
+
+    python benchmarks/bench_login.py [--clients 16] [--workers 2] [--method pbkdf2:sha256:600000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from passwords import HashingBusy, _run
+from ratelimit import MemoryLimiter, parse_rate
+
+
+def make_app(args):
+    app = Flask(__name__)
+    app.config.update(
+        PASSWORD_HASH_METHOD=args.method,
+        PASSWORD_HASH_WORKERS=args.workers,
+        PASSWORD_HASH_QUEUE=args.clients,
+        PASSWORD_HASH_TIMEOUT=60,
+    )
+    return app
+
+
+def probe_work():
+    return sum(i * i for i in range(20000))
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    return statistics.quantiles(samples, n=100)[p - 1] if len(samples) > 1 else samples[0]
+
+
+def run(app, verify, stored, clients, seconds):
+    stop = time.perf_counter() + seconds
+    logins, probes = [], []
+    lock = threading.Lock()
+
+    def client():
+        with app.app_context():
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    verify(stored, 'abc123')
+                except HashingBusy:
+                    continue
+                with lock:
+                    logins.append(time.perf_counter() - started)
+
+    def probe():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            probe_work()
+            probes.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return logins, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    args = parser.parse_args()
+
+    app = make_app(args)
+    stored = generate_password_hash('abc123', args.method)
+
+    started = time.perf_counter()
+    probe_work()
+    print(f"probe alone: {(time.perf_counter() - started) * 1000:.1f} ms; {os.cpu_count()} CPU(s)")
+    print(f"{'mode':<14} {'logins/s':>9} {'login p50':>10} {'login p95':>10} {'probes/s':>9} {'probe p95':>10}")
+
+    modes = (
+        ('inline', check_password_hash),
+        (f"pool ({args.workers})", lambda stored, password: _run(check_password_hash, stored, password)),
+    )
+    for label, verify in modes:
+        logins, probes = run(app, verify, stored, args.clients, args.seconds)
+        print(f"{label:<14} {len(logins) / args.seconds:>9.1f} "
+              f"{percentile(logins, 50) * 1000:>8.0f}ms {percentile(logins, 95) * 1000:>8.0f}ms "
+              f"{len(probes) / args.seconds:>9.0f} {percentile(probes, 95) * 1000:>8.1f}ms")
+
+    limiter = MemoryLimiter()
+    capacity, refill = parse_rate('30/60')
+    count = 200000
+    started = time.perf_counter()
+    for i in range(count):
+        limiter.take(f"ip:10.0.{i % 250}.{i % 7}", capacity, refill)
+    elapsed = time.perf_counter() - started
+    print(f"memory rate limiter: {count / elapsed:,.0f} checks/s")
+
+
+if __name__ == '__main__':
+    main()
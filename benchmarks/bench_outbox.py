@@ -0,0 +1,183 @@
+"""Mail outbox benchmark against a local SMTP stand-in.
+
+Starts a minimal threaded SMTP server on localhost that takes ``--latency``
+seconds per message and answers 451 to the first ``--transient-failures``
+recipients. It then compares:
+
+- the request-path cost of sending a password reset mail synchronously
+  with Flask-Mail against enqueueing it in the outbox;
+- draining ``--messages`` queued messages over one connection per batch
+  against one connection per message;
+- whether every message arrives exactly once after the transient failures
+  are retried.
+
+    python benchmarks/bench_outbox.py [--messages 200] [--latency 0.05]
+"""
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+from models import db, OutboxMessage
+from outbox import enqueue_mail, drain_outbox
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: delivered messages are appended to ``delivered``."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0, transient_failures=0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.latency = latency
+        self.transient_failures = transient_failures
+        self.delivered = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost SMTP stand-in')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode(errors='replace').rstrip('\r\n')
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                with server.lock:
+                    refuse = server.transient_failures > 0
+                    server.transient_failures -= refuse
+                if refuse:
+                    self.reply('451 Try again later')
+                else:
+                    recipients.append(line.split(':', 1)[1].strip(' <>'))
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(server.latency)
+                with server.lock:
+                    server.delivered.extend(recipients)
+                self.reply('250 OK queued')
+            elif command == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+def make_app(path, port):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False,
+        MAIL_DEFAULT_SENDER='bench@example.com',
+        MAIL_BATCH_SIZE=50, MAIL_SEND_LEASE=300, MAIL_MAX_ATTEMPTS=8,
+        MAIL_RETRY_BACKOFF=0, MAIL_RETRY_MAX_BACKOFF=0,
+    )
+    db.init_app(app)
+    Mail(app)
+    return app
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return sum(samples) / len(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds the stand-in takes per message.')
+    parser.add_argument('--transient-failures', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, SMTPStandIn(args.latency) as smtp:
+        app = make_app(os.path.join(tmp, 'bench.db'), smtp.server_address[1])
+        with app.app_context():
+            db.create_all()
+            mail = app.extensions['mail']
+
+            def send_directly():
+                mail.send(Message('Reset', recipients=['user@example.com'], body='link'))
+
+            def enqueue():
+                enqueue_mail('user@example.com', 'Reset', 'link')
+                db.session.commit()
+
+            print("request path (ms per password reset mail)")
+            print(f"  synchronous send {timed(send_directly, args.repeat):8.1f}")
+            print(f"  outbox enqueue   {timed(enqueue, args.repeat):8.1f}")
+            drain_outbox()
+
+            print(f"drain {args.messages} messages")
+            for label, batch_size in (('one connection per message', 1), ('one connection per batch', None)):
+                for i in range(args.messages):
+                    enqueue_mail(f"user{i}@example.com", 'Report', 'body')
+                db.session.commit()
+                connections = smtp.connections
+                started = time.perf_counter()
+                drain_outbox(batch_size)
+                elapsed = time.perf_counter() - started
+                print(f"  {label:<27} {elapsed * 1000:8.0f} ms  {smtp.connections - connections:4d} connections")
+
+            smtp.delivered.clear()
+            smtp.transient_failures = args.transient_failures
+            recipients = [f"retry{i}@example.com" for i in range(args.messages)]
+            for recipient in recipients:
+                enqueue_mail(recipient, 'Retry', 'body')
+            db.session.commit()
+            drain_outbox()
+            while OutboxMessage.query.filter_by(status='pending').count():
+                drain_outbox()
+            exactly_once = sorted(smtp.delivered) == sorted(recipients)
+            print(f"retry after {args.transient_failures} transient failures: "
+                  f"delivered {len(smtp.delivered)}/{len(recipients)}, exactly once: {exactly_once}")
+            db.session.remove()
+            db.engine.dispose()
+        if not exactly_once:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
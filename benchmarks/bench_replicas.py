@@ -0,0 +1,145 @@
+"""Read-replica routing with two local SQLite databases.
+
+Generates a ledger in a primary SQLite file and copies it to a replica
+file, which the app opens read-only (``mode=ro``), so any write routed to
+it fails loudly. Then, counting the statements each database runs:
+
+- the routed GETs (dashboard, chart APIs, CSV export) and a PDF report read
+  from the replica while writes go to the primary;
+- after a write, the writer's own reads stay on the primary for
+  REPLICA_STICKY_SECONDS while other sessions still read the (stale)
+  replica;
+- with the replica file gone, a routed request is retried on the primary,
+  later ones skip the replica, and it is used again once it is back.
+
+Against MySQL, set SQLALCHEMY_DATABASE_URI and REPLICA_DATABASE_URIS to an
+empty primary and a replica that replicates it (the lag checks then
+depend on real replication).
+
+    python benchmarks/bench_replicas.py [--transactions 5000] [--repeat 20]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+tmp_dir = tempfile.mkdtemp()
+PRIMARY = os.path.join(tmp_dir, 'primary.db')
+REPLICA = os.path.join(tmp_dir, 'replica.db')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{PRIMARY}")
+os.environ.setdefault('REPLICA_DATABASE_URIS', f"sqlite:///file:{REPLICA}?mode=ro&uri=true")
+os.environ.setdefault('REPLICA_STICKY_SECONDS', '2')
+os.environ.setdefault('REPLICA_RETRY_INTERVAL', '1')
+os.environ.setdefault('REPLICA_CHECK_INTERVAL', '60')  # so the outage is met by a request, not a ping
+os.environ.setdefault('CHART_CACHE_BACKEND', 'none')
+os.environ.setdefault('RATELIMIT_BACKEND', 'none')
+os.environ.setdefault('MAIL_OUTBOX_SENDER', 'False')
+os.environ.setdefault('REPORT_DIR', os.path.join(tmp_dir, 'reports'))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db
+from datagen import generate_ledger
+
+app = create_app()
+
+ROUTED = ['/dashboard', '/api/dashboard-summary', '/api/insights', '/api/expense-breakdown',
+          '/api/income-expense-trend', '/export/csv']
+
+statements = Counter()
+
+
+def count_statements(name):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements[name] += 1
+    return before_cursor_execute
+
+
+def login(email):
+    client = app.test_client()
+    assert client.post('/login', data={'email': email, 'password': 'bench123'}).status_code == 302
+    return client
+
+
+def get(client, path):
+    response = client.get(path)
+    response.get_data()
+    assert response.status_code == 200, f"{path} returned {response.status_code}"
+    return response
+
+
+def run(label, action):
+    statements.clear()
+    started = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<52} primary {statements['primary']:>5}  replica {statements['replica0']:>5}  {elapsed * 1000:8.0f} ms")
+    return result
+
+
+def transaction_count(client):
+    return len(get(client, '/export/csv').get_data(as_text=True).splitlines()) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all(bind_key=None)  # the replica is copied from it below
+        (_, alice), (_, bob) = generate_ledger(users=2, transactions=args.transactions)
+        for name, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute', count_statements(name or 'primary'))
+        uri = str(db.engine.url)
+    if uri.startswith('sqlite:///'):
+        with sqlite3.connect(PRIMARY) as source, sqlite3.connect(REPLICA) as target:
+            source.backup(target)
+
+    writer, reader = login(alice), login(bob)
+    print(f"{'':<52} {'statements':>23}")
+    run(f"{args.repeat} x routed GETs", lambda: [get(reader, path) for _ in range(args.repeat) for path in ROUTED])
+    run(f"{args.repeat} x budgets page (not routed)", lambda: [get(reader, '/budgets') for _ in range(args.repeat)])
+
+    def pdf():
+        job = reader.post('/api/reports/pdf').get_json()
+        while job['status'] in ('queued', 'running'):
+            time.sleep(0.01)
+            job = reader.get(f"/api/reports/{job['id']}").get_json()
+        assert job['status'] == 'done', job
+    run("PDF report (job rows on primary, render on replica)", pdf)
+
+    with app.app_context():
+        category_id = db.session.execute(
+            db.text("SELECT id FROM category WHERE user_id = (SELECT id FROM user WHERE email = :email) LIMIT 1"),
+            {'email': alice}
+        ).scalar()
+    before = transaction_count(writer)
+    run("writer adds a transaction", lambda: writer.post('/dashboard', data={'amount': '12.5', 'category_id': category_id}))
+    seen = run("writer's CSV export right after", lambda: transaction_count(writer))
+    print(f"  writer sees {seen - before:+d} transaction(s) (read from the primary)")
+    time.sleep(float(os.environ['REPLICA_STICKY_SECONDS']) + 0.1)
+    seen = run("writer's CSV export after REPLICA_STICKY_SECONDS", lambda: transaction_count(writer))
+    print(f"  writer sees {seen - before:+d} transaction(s) (the replica was copied before the write)")
+
+    if uri.startswith('sqlite:///'):
+        os.rename(REPLICA, REPLICA + '.away')
+        with app.app_context():
+            db.engines['replica0'].dispose()
+        run("replica gone: routed GET retried on the primary", lambda: get(reader, '/api/expense-breakdown'))
+        run("replica gone: next routed GETs", lambda: [get(reader, path) for path in ROUTED])
+        shutil.move(REPLICA + '.away', REPLICA)
+        time.sleep(float(os.environ['REPLICA_RETRY_INTERVAL']) + 0.1)
+        run("replica back after REPLICA_RETRY_INTERVAL", lambda: [get(reader, path) for path in ROUTED])
+
+
+if __name__ == '__main__':
+    main()
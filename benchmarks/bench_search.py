@@ -0,0 +1,116 @@
+"""Note search benchmark.
+
+Times the old leading-wildcard ILIKE note filter against the indexed word
+search (search.py) for one user's history, both as the dashboard's first
+page filter and as a ranked /api/search query. The default searches cover
+a common word prefix (shop4), a rarer one (shop42), a single word (coffee)
+and a word no note contains.
+
+    python benchmarks/bench_search.py [--sizes 10000,100000,300000] [--queries shop4,zzznomatch]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from models import db, User, Transaction, Category
+from aggregates import filter_transactions
+from search import reindex_notes, search_transactions
+
+WORDS = [
+    'groceries', 'rent', 'uber', 'coffee', 'salary', 'electricity', 'netflix', 'gym', 'pharmacy',
+    'dinner', 'lunch', 'fuel', 'insurance', 'gift', 'books', 'internet', 'mobile', 'bonus', 'taxi',
+] + [f"shop{i}" for i in range(500)]
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def seed(user_id, category_id, count, rng):
+    start = datetime.utcnow() - timedelta(days=365 * 10)
+    rows = [
+        {
+            'user_id': user_id,
+            'amount': round(rng.uniform(1, 5000), 2),
+            'category_id': category_id,
+            'note': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))),
+            'timestamp': start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 10)),
+        }
+        for _ in range(count)
+    ]
+    db.session.execute(db.insert(Transaction), rows)
+    db.session.commit()
+    reindex_notes(user_id)
+
+
+def first_page_ilike(user_id, search):
+    return (
+        Transaction.query.filter_by(user_id=user_id)
+        .filter(Transaction.note.ilike(f"%{search}%"))
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(50).all()
+    )
+
+
+def first_page_indexed(user_id, search):
+    return (
+        filter_transactions(Transaction.query, user_id, search_note=search, paged=True)
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(50).all()
+    )
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,300000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--queries', default='shop4,shop42,coffee,zzznomatch')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'rows':>10} {'query':>12} {'ilike ms':>9} {'indexed ms':>11} {'ranked ms':>10}")
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+                user = User(email='bench@example.com', password='x')
+                db.session.add(user)
+                db.session.commit()
+                category = Category(name='Other', type='Expense', user_id=user.id)
+                db.session.add(category)
+                db.session.commit()
+                seed(user.id, category.id, size, rng)
+
+                for query in args.queries.split(','):
+                    ilike_ms = timed(lambda: first_page_ilike(user.id, query), args.repeat)
+                    indexed_ms = timed(lambda: first_page_indexed(user.id, query), args.repeat)
+                    ranked_ms = timed(lambda: search_transactions(user.id, query), args.repeat)
+                    print(f"{size:>10} {query:>12} {ilike_ms:>9.1f} {indexed_ms:>11.1f} {ranked_ms:>10.1f}")
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
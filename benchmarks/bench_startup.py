@@ -0,0 +1,176 @@
+"""Cold start and per-worker memory.
+
+Cold start: ``--runs`` fresh interpreters each import app.py and call
+create_app(), reporting the time taken, the modules loaded and the RSS,
+then the time of the first dashboard request (which pays for anything
+imported lazily).
+
+Memory: gunicorn starts ``--workers`` workers from gunicorn.conf.py, once
+with GUNICORN_PRELOAD=False and once with True. Every worker is warmed up
+with dashboard, insights and PDF requests so the lazily imported modules
+are loaded, then its RSS, PSS (shared pages split between the processes
+sharing them) and USS (pages only it uses) are read from
+/proc/<pid>/smaps_rollup. Linux only.
+
+    python benchmarks/bench_startup.py [--runs 5] [--workers 4]
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+COLD_START = r'''
+import json, os, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+built = time.perf_counter() - started
+with open('/proc/self/status') as fh:
+    rss = next(int(line.split()[1]) for line in fh if line.startswith('VmRSS'))
+client = app.test_client()
+client.post('/login', data={'email': 'startup0-0@example.com', 'password': 'bench123'})
+started = time.perf_counter()
+assert client.get('/dashboard').status_code == 200
+first = time.perf_counter() - started
+print(json.dumps({'seconds': built, 'modules': len(sys.modules), 'rss_kb': rss, 'first_request': first}))
+'''
+
+SETUP = r'''
+from app import create_app
+from models import db
+from datagen import generate_ledger
+app = create_app()
+with app.app_context():
+    db.create_all()
+    generate_ledger(users=1, transactions=2000, email_prefix='startup', seed=0)
+'''
+
+
+def environment(tmp_dir):
+    env = dict(os.environ)
+    env.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp_dir, 'startup.db')}",
+        REPORT_DIR=os.path.join(tmp_dir, 'reports'),
+        CHART_CACHE_BACKEND='none',
+        RATELIMIT_BACKEND='none',
+        MAIL_OUTBOX_SENDER='False',
+        RECURRING_SCHEDULER='False',
+        PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, 'benchmarks')]),
+    )
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    return env
+
+
+def cold_start(env, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def warm_up(base, workers):
+    # Each request opens a new connection, so the workers take turns at the socket
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    login = urllib.parse.urlencode({'email': 'startup0-0@example.com', 'password': 'bench123'}).encode()
+    for _ in range(workers * 6):
+        opener.open(base + '/login', login).read()
+        opener.open(base + '/dashboard').read()
+        opener.open(base + '/api/insights').read()
+        opener.open(urllib.request.Request(base + '/api/reports/pdf', method='POST')).read()
+    time.sleep(1)  # let the last reports render
+
+
+def gunicorn_memory(env, workers, preload):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD=str(preload))
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                urllib.request.urlopen(base + '/login').read()
+                break
+            except OSError:
+                if master.poll() is not None or time.perf_counter() - started > 60:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.1)
+        ready = time.perf_counter() - started
+
+        warm_up(base, workers)
+        children = subprocess.run(['pgrep', '-P', str(master.pid)], capture_output=True, text=True).stdout.split()
+        per_worker = [memory_kb(int(pid)) for pid in children]
+        return {
+            'ready_seconds': ready,
+            'workers': len(per_worker),
+            'master': memory_kb(master.pid),
+            'worker': {key: statistics.fmean(m[key] for m in per_worker) for key in ('rss', 'pss', 'uss')},
+        }
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    env = environment(tmp_dir)
+    subprocess.run([sys.executable, '-c', SETUP], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    cold = cold_start(env, args.runs)
+    print(f"Cold start (median of {args.runs}): create_app {cold['seconds'] * 1000:.0f} ms, "
+          f"{cold['modules']:.0f} modules, RSS {cold['rss_kb'] / 1024:.1f} MiB; "
+          f"first dashboard request {cold['first_request'] * 1000:.0f} ms")
+
+    print(f"\n{args.workers} gunicorn workers, after warm-up (MiB):")
+    print(f"{'':<12} {'ready s':>8} {'master RSS':>11} {'worker RSS':>11} {'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}")
+    for preload in (False, True):
+        result = gunicorn_memory(env, args.workers, preload)
+        worker = result['worker']
+        total = result['master']['pss'] + worker['pss'] * result['workers']
+        print(f"{'preload' if preload else 'no preload':<12} {result['ready_seconds']:>8.2f} "
+              f"{result['master']['rss'] / 1024:>11.1f} {worker['rss'] / 1024:>11.1f} "
+              f"{worker['pss'] / 1024:>11.1f} {worker['uss'] / 1024:>11.1f} {total / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
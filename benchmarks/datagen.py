@@ -0,0 +1,157 @@
+"""Synthetic ledger generator.
+
+Creates users with a configurable number of categories, transactions and
+budgets, bulk-inserted with their content hashes, monthly rollups and
+note search index. The same seed and end date always produce the same
+ledgers; transactions are spread over the ``months`` months up to the end
+date (the start of today by default).
+
+Used by run_benchmarks.py, or on its own to fill a development database:
+
+    python benchmarks/datagen.py --users 5 --transactions 20000 [--seed 1]
+    SQLALCHEMY_DATABASE_URI=mysql+mysqlconnector://... python benchmarks/datagen.py ...
+
+Every generated user's password is ``bench123`` (see --password).
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Transaction, Category, Budget, transaction_hash
+from rollups import rebuild_rollups
+from search import reindex_notes
+
+INCOME_NAMES = ['Salary', 'Freelance', 'Dividends', 'Interest', 'Rental', 'Refunds']
+EXPENSE_NAMES = [
+    'Food', 'Transport', 'Shopping', 'Bills', 'Entertainment', 'Healthcare', 'Rent', 'Groceries',
+    'Travel', 'Education', 'Insurance', 'Gifts', 'Fitness', 'Subscriptions', 'Pets', 'Other',
+]
+COLORS = ['#28a745', '#20c997', '#dc3545', '#fd7e14', '#e83e8c', '#6610f2', '#17a2b8', '#ffc107', '#6c757d']
+NOTE_WORDS = [
+    'groceries', 'supermarket', 'coffee', 'lunch', 'dinner', 'taxi', 'metro', 'fuel', 'parking', 'pharmacy',
+    'electricity', 'water', 'internet', 'phone', 'rent', 'gym', 'cinema', 'concert', 'books', 'course',
+    'flight', 'hotel', 'insurance', 'gift', 'vet', 'streaming', 'salary', 'invoice', 'bonus', 'refund',
+    'amazon', 'market', 'bakery', 'restaurant', 'pizza', 'uber', 'train', 'bus', 'doctor', 'dentist',
+]
+
+
+def _month_start(anchor, months_back):
+    year, month = divmod(anchor.year * 12 + anchor.month - 1 - months_back, 12)
+    return datetime(year, month + 1, 1)
+
+
+def _note(rng):
+    if rng.random() < 0.1:
+        return None
+    words = rng.sample(NOTE_WORDS, rng.randint(1, 3))
+    if rng.random() < 0.3:
+        words.append(f"#{rng.randint(1000, 9999)}")
+    return ' '.join(words)
+
+
+def generate_ledger(users=10, transactions=5000, categories=12, budgets=6, months=24, seed=0,
+                    end=None, password='bench123', email_prefix='bench', batch_size=5000):
+    """Create ``users`` ledgers and return their (user_id, email) pairs.
+
+    Each user gets ``categories`` categories (about a quarter of them
+    income), ``transactions`` transactions and ``budgets`` expense budgets
+    for the most recent months. Runs inside an app context and commits.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = _month_start(end, months - 1)
+    span_minutes = max(int((end - start).total_seconds() // 60), 1)
+    # One hash for everybody: hashing per user would dominate generation time
+    password_hash = generate_password_hash(password, current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256'))
+
+    created = []
+    for u in range(users):
+        email = f"{email_prefix}{seed}-{u}@example.com"
+        user = User(email=email, password=password_hash)
+        db.session.add(user)
+        db.session.flush()
+
+        income_count = max(1, round(categories / 4))
+        names = INCOME_NAMES[:income_count] + EXPENSE_NAMES[:categories - income_count]
+        names += [f"Category {i}" for i in range(len(names), categories)]
+        category_rows = [
+            Category(name=name, type='Income' if i < income_count else 'Expense',
+                     color=COLORS[i % len(COLORS)], user_id=user.id)
+            for i, name in enumerate(names)
+        ]
+        db.session.add_all(category_rows)
+        db.session.flush()
+
+        # Expense amounts are log-normal around a per-category typical size
+        profiles = [
+            (c.id, c.type, math.log(rng.uniform(1500, 6000) if c.type == 'Income' else rng.uniform(5, 300)))
+            for c in category_rows
+        ]
+        incomes = [p for p in profiles if p[1] == 'Income']
+        expenses = [p for p in profiles if p[1] == 'Expense'] or incomes
+
+        for offset in range(0, transactions, batch_size):
+            rows = []
+            for _ in range(min(batch_size, transactions - offset)):
+                category_id, _, mu = rng.choice(incomes if rng.random() < 0.15 else expenses)
+                amount = round(rng.lognormvariate(mu, 0.6), 2)
+                timestamp = start + timedelta(minutes=rng.randrange(span_minutes))
+                note = _note(rng)
+                rows.append({
+                    'user_id': user.id, 'amount': amount, 'category_id': category_id, 'note': note,
+                    'timestamp': timestamp, 'is_recurring': False,
+                    'content_hash': transaction_hash(timestamp, amount, category_id, note),
+                })
+            db.session.execute(db.insert(Transaction), rows)
+
+        budget_rows = []
+        for back in range(months):
+            period = _month_start(end, back)
+            for category_id, category_type, mu in expenses:
+                if len(budget_rows) == budgets:
+                    break
+                budget_rows.append(Budget(
+                    user_id=user.id, category_id=category_id, month=period.month, year=period.year,
+                    amount=round(math.exp(mu) * transactions / max(months, 1) / len(expenses) * rng.uniform(0.8, 1.3), 2)
+                ))
+        db.session.add_all(budget_rows)
+
+        rebuild_rollups(user.id)
+        db.session.commit()
+        reindex_notes(user.id)
+        created.append((user.id, email))
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--transactions', type=int, default=5000, help='Per user.')
+    parser.add_argument('--categories', type=int, default=12, help='Per user.')
+    parser.add_argument('--budgets', type=int, default=6, help='Per user.')
+    parser.add_argument('--months', type=int, default=24, help='History length.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--password', default='bench123')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        users = generate_ledger(args.users, args.transactions, args.categories, args.budgets,
+                                args.months, args.seed, password=args.password)
+    for user_id, email in users:
+        print(f"{user_id}\t{email}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Query-plan check for the hot read paths.
+
+Drives the dashboard, budgets, chart APIs and exports through the Flask
+test client (and the PDF renderer directly), captures every SELECT they
+issue and runs EXPLAIN on it.
+Exits non-zero if any query against a ledger table falls back to a full
+table scan instead of using an index.
+
+    python benchmarks/explain_queries.py
+    SQLALCHEMY_DATABASE_URI=mysql+mysqlconnector://... python benchmarks/explain_queries.py
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{os.path.join(tmp_dir, 'explain.db')}")
+os.environ.setdefault('MAIL_OUTBOX_SENDER', 'False')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, User, Transaction, Category, Budget
+from rollups import rebuild_rollups
+from exports import render_pdf
+from recurring import materialize_due
+from search import reindex_notes
+from outbox import send_due
+
+app = create_app()
+
+LEDGER_TABLES = (
+    'transaction', 'transaction_archive', 'budget', 'monthly_summary', 'category', 'change_log',
+    'note_token', 'archived_note_token', 'outbox_message'
+)
+
+HOT_PATHS = [
+    '/dashboard',
+    '/dashboard?start_date=2024-01-01&end_date=2024-06-30&note=note',
+    '/api/transactions',
+    '/api/transactions?note=note%201',
+    '/api/search?q=note',
+    '/api/dashboard-summary',
+    '/api/insights',
+    '/api/expense-breakdown',
+    '/api/income-expense-trend',
+    '/budgets',
+    '/export/csv',
+    '/api/sync',
+    '/api/sync?since=MHww',
+]
+
+
+def seed(client):
+    client.post('/register', data={'email': 'explain@example.com', 'password': 'explain1'})
+    client.post('/login', data={'email': 'explain@example.com', 'password': 'explain1'})
+
+    with app.app_context():
+        user_id = User.query.filter_by(email='explain@example.com').first().id
+        category_ids = {c.name: c.id for c in Category.query.filter_by(user_id=user_id)}
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Transaction), [
+            {
+                'user_id': user_id,
+                'amount': 10 + i,
+                'category_id': category_ids[('Food', 'Salary', 'Bills')[i % 3]],
+                'note': f"note {i}",
+                'timestamp': now - timedelta(days=i),
+            }
+            for i in range(500)
+        ])
+        db.session.add(Budget(user_id=user_id, category_id=category_ids['Food'], amount=1000, month=now.month, year=now.year))
+        rebuild_rollups(user_id)
+        db.session.commit()
+        reindex_notes(user_id)
+    return user_id
+
+
+def full_scans(connection, statement, parameters):
+    """Return the plan lines for ``statement`` that scan a ledger table without an index."""
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [
+            row[-1] for row in plan
+            if re.match(r"SCAN (\w+)$", row[-1]) and row[-1].split()[1].strip('"') in LEDGER_TABLES
+        ]
+
+    plan = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().fetchall()
+    return [
+        f"{row['table']}: type=ALL" for row in plan
+        if row['type'] == 'ALL' and row['table'] in LEDGER_TABLES
+    ]
+
+
+def main():
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+    user_id = seed(client)
+
+    def get(path):
+        response = client.get(path)
+        response.get_data()
+        assert response.status_code == 200, f"{path} returned {response.status_code}"
+
+    # The PDF report, recurring runner and mail sender work outside requests, so their queries are checked directly
+    checks = [(path, lambda path=path: get(path)) for path in HOT_PATHS]
+    checks.append(('render_pdf', lambda: render_pdf(user_id, io.BytesIO())))
+    checks.append(('materialize_due', materialize_due))
+    checks.append(('send_due', send_due))
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            captured.append((statement, parameters))
+
+    failures = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            for path, run in checks:
+                captured.clear()
+                run()
+
+                with db.engine.connect() as connection:
+                    for statement, parameters in captured:
+                        for line in full_scans(connection, statement, parameters):
+                            failures.append((path, line, statement))
+                print(f"{path}: {len(captured)} queries checked")
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+    for path, line, statement in failures:
+        print(f"\nFULL SCAN on {path}: {line}\n  {' '.join(statement.split())}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
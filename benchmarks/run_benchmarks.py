@@ -0,0 +1,229 @@
+"""End-to-end benchmark of QuickLedger's hot paths.
+
+Generates a synthetic dataset (see datagen.py), then drives the
+dashboard, budgets, both chart APIs and both exports through the Flask
+test client as the generated users. For each path it records p50/p99
+latency, SQL queries per request and peak Python memory (from a separate
+tracemalloc pass, so tracing does not skew the timings). Results can be
+written as a JSON baseline and compared with an earlier one; the run
+exits non-zero when a path's p50 slows down beyond ``--tolerance`` or it
+issues more queries than before.
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json
+    SQLALCHEMY_DATABASE_URI=mysql+mysqlconnector://user:pw@localhost/ql_bench python benchmarks/run_benchmarks.py
+
+Against MySQL, use an empty scratch database: the dataset is added to it.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+# Measure the work itself: no response cache, no auth throttling, no background threads
+os.environ.setdefault('CHART_CACHE_BACKEND', 'none')
+os.environ.setdefault('RATELIMIT_BACKEND', 'none')
+os.environ.setdefault('MAIL_OUTBOX_SENDER', 'False')
+os.environ.setdefault('RECURRING_SCHEDULER', 'False')
+os.environ.setdefault('REPORT_DIR', os.path.join(tmp_dir, 'reports'))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, User
+from datagen import generate_ledger
+
+app = create_app()
+
+PATHS = [
+    '/dashboard',
+    '/budgets',
+    '/api/expense-breakdown',
+    '/api/income-expense-trend',
+    '/export/csv',
+    '/export/pdf',
+]
+
+# Set while this thread polls a report job, so the polls are not counted as the export's queries
+_polling = threading.local()
+
+
+def login(email, password):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302, f"login failed for {email}"
+    return client
+
+
+def request_pdf(client):
+    """Request a PDF report, poll until the background worker finishes and download it."""
+    job = client.post('/api/reports/pdf').get_json()
+    _polling.active = True
+    try:
+        while job['status'] in ('queued', 'running'):
+            time.sleep(0.005)
+            job = client.get(f"/api/reports/{job['id']}").get_json()
+    finally:
+        _polling.active = False
+    assert job['status'] == 'done', job
+    return client.get(job['download_url'])
+
+
+def prepare(path, user_id):
+    """Untimed setup: reports are reused until the data changes, so force a fresh render."""
+    if path == '/export/pdf':
+        with app.app_context():
+            User.bump_data_version(user_id)
+            db.session.commit()
+
+
+def run_path(path, client):
+    if path == '/export/pdf':
+        response = request_pdf(client)
+    else:
+        response = client.get(path)
+    response.get_data()
+    assert response.status_code == 200, f"{path} returned {response.status_code}"
+
+
+def percentile(samples, p):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+
+def measure(sessions, repeat):
+    queries = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if not getattr(_polling, 'active', False):
+            queries.append(statement)
+
+    results = {}
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for path in PATHS:
+            timings, counts = [], []
+            prepare(path, sessions[0][1])
+            run_path(path, sessions[0][0])  # warm-up
+            for i in range(repeat):
+                client, user_id = sessions[i % len(sessions)]
+                prepare(path, user_id)
+                queries.clear()
+                started = time.perf_counter()
+                run_path(path, client)
+                timings.append(time.perf_counter() - started)
+                counts.append(len(queries))
+
+            client, user_id = sessions[0]
+            prepare(path, user_id)
+            tracemalloc.start()
+            run_path(path, client)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[path] = {
+                'requests': repeat,
+                'p50_ms': round(percentile(timings, 50) * 1000, 2),
+                'p99_ms': round(percentile(timings, 99) * 1000, 2),
+                'mean_ms': round(statistics.fmean(timings) * 1000, 2),
+                'queries': round(statistics.fmean(counts), 1),
+                'peak_kb': round(peak / 1024, 1),
+            }
+            row = results[path]
+            print(f"{path:<28} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['queries']:>8.1f} {row['peak_kb']:>10.0f}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Print the change against ``baseline`` and return the paths that regressed."""
+    regressions = []
+    print(f"\n{'path':<28} {'p50 change':>11} {'p99 change':>11} {'queries':>15}")
+    for path, row in results.items():
+        old = baseline['results'].get(path)
+        if not old:
+            print(f"{path:<28} {'(new)':>11}")
+            continue
+        p50 = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        p99 = (row['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100 if old['p99_ms'] else 0.0
+        print(f"{path:<28} {p50:>+10.1f}% {p99:>+10.1f}% {old['queries']:>6.1f} -> {row['queries']:<6.1f}")
+        slower = p50 > tolerance and row['p50_ms'] - old['p50_ms'] > min_delta_ms
+        if slower or row['queries'] > old['queries']:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--transactions', type=int, default=10000, help='Per user.')
+    parser.add_argument('--categories', type=int, default=12, help='Per user.')
+    parser.add_argument('--budgets', type=int, default=8, help='Per user.')
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50, help='Requests per path.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare with the results in this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=20.0,
+                        help='Allowed p50 slowdown in percent before a path counts as a regression.')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore p50 slowdowns smaller than this, which are mostly noise on fast paths.')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        users = generate_ledger(args.users, args.transactions, args.categories, args.budgets,
+                                args.months, args.seed)
+        print(f"Generated {args.users} users x {args.transactions} transactions "
+              f"in {time.perf_counter() - started:.1f}s on {db.engine.dialect.name}")
+
+    sessions = [(login(email, 'bench123'), user_id) for user_id, email in users]
+    print(f"\n{'path':<28} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>10}")
+    results = measure(sessions, args.repeat)
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': dialect,
+            'python': platform.python_version(),
+            'dataset': {key: getattr(args, key) for key in ('users', 'transactions', 'categories', 'budgets', 'months', 'seed')},
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline['meta']['dataset'] != report['meta']['dataset'] or baseline['meta']['database'] != dialect:
+            print("\nWarning: the baseline was recorded with a different dataset or database.")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
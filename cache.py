@@ -0,0 +1,125 @@
+"""Response cache for per-user JSON payloads such as the chart APIs.
+
+Entries are keyed by the user's data_version, which every ledger write
+bumps, so a write makes the old entries unreachable without any explicit
+invalidation; they simply age out of the backend.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import current_app, request
+
+from models import db, User
+from metrics import CACHE_REQUESTS
+
+
+class NullCache:
+    """Backend that stores nothing (CHART_CACHE_BACKEND=none)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+class LRUCache:
+    """In-process, thread-safe LRU. Each worker process keeps its own copy."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class RedisCache:
+    """Shared cache on a Redis-compatible server (Redis, Valkey, KeyDB...)."""
+
+    def __init__(self, url, ttl=3600, prefix='quickledger:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CHART_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+
+def init_cache(app):
+    backend = app.config['CHART_CACHE_BACKEND']
+    if backend == 'redis':
+        cache = RedisCache(app.config['CHART_CACHE_REDIS_URL'], ttl=app.config['CHART_CACHE_TTL'])
+    elif backend == 'lru':
+        cache = LRUCache(app.config['CHART_CACHE_SIZE'])
+    elif backend == 'none':
+        cache = NullCache()
+    else:
+        raise ValueError(f"Unknown CHART_CACHE_BACKEND: {backend}")
+    app.extensions['chart_cache'] = cache
+    return cache
+
+
+def cache_key(name, user_id, period='', args=()):
+    """Key of a user's cached payload, which changes with their data_version.
+
+    ``period`` names the date a payload depends on besides the data, e.g.
+    the current month for this month's budgets, so it expires when the
+    date moves on without a write. ``args`` are the query arguments.
+    """
+    version = db.session.query(User.data_version).filter_by(id=user_id).scalar()
+    return f"{name}:{user_id}:{version}:{period}:{urlencode(sorted(args))}"
+
+
+def cached_body(key, build):
+    """The JSON-encoded ``build()`` for ``key``, from the cache when present."""
+    cache = current_app.extensions['chart_cache']
+    body = cache.get(key)
+    if body is None:
+        CACHE_REQUESTS.labels('chart', 'miss').inc()
+        body = current_app.json.dumps(build()).encode()
+        cache.set(key, body)
+    else:
+        CACHE_REQUESTS.labels('chart', 'hit').inc()
+    return body
+
+
+def cached_json(name, user_id, build, period=''):
+    """Serve ``build()`` as JSON, cached per user, data version, ``period`` and query string.
+
+    The ETag is derived from the same key, so a matching If-None-Match is
+    answered with 304 after a single primary-key lookup of the version.
+    """
+    key = cache_key(name, user_id, period, request.args.items(multi=True))
+    etag = hashlib.sha1(key.encode()).hexdigest()
+
+    if etag in request.if_none_match:
+        CACHE_REQUESTS.labels('chart', 'not_modified').inc()
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(cached_body(key, build), mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
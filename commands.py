@@ -0,0 +1,147 @@
+"""``flask`` CLI commands, added to the app by create_app."""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, User
+from rollups import rebuild_rollups
+from migrations import run_migrations
+from sync import prune_change_log
+from recurring import materialize_due
+from search import reindex_notes
+from outbox import drain_outbox, prune_outbox
+from archive import archive_closed_periods
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Create missing tables and upgrade existing ones to the current schema."""
+    applied = run_migrations()
+    for name in applied:
+        click.echo(f"Applied {name}")
+    click.echo("Database is up to date.")
+
+
+@click.command('import-csv')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--email', required=True, help='Account to import into.')
+@click.option('--dayfirst', is_flag=True, help='Parse ambiguous dates as DD/MM/YYYY.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def import_csv_command(path, email, dayfirst, batch_size):
+    """Bulk-import transactions from a CSV export or bank statement."""
+    from importer import ImportFormatError, import_csv
+
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f"No user with email {email}")
+
+    with open(path, encoding='utf-8-sig', newline='') as fh:
+        try:
+            result = import_csv(user.id, fh, dayfirst=dayfirst, batch_size=batch_size)
+        except ImportFormatError as e:
+            raise click.ClickException(str(e))
+
+    click.echo(f"Imported {result['imported']}, duplicates {result['duplicates']}, invalid {result['error_count']}.")
+    if result['created_categories']:
+        click.echo(f"Created categories: {', '.join(result['created_categories'])}")
+    for error in result['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}")
+
+
+@click.command('materialize-recurring')
+@with_appcontext
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def materialize_recurring_command(batch_size):
+    """Create all recurring transactions that have come due (run from cron)."""
+    result = materialize_due(batch_size=batch_size)
+    click.echo(f"Created {result['created']} transaction(s) from {result['templates']} recurring template(s).")
+
+
+@click.command('reindex-notes')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only reindex this user.')
+def reindex_notes_command(user_id):
+    """Rebuild the note search word indexes (on MySQL only the archive's; live notes use FULLTEXT)."""
+    indexed = reindex_notes(user_id)
+    click.echo(f"Indexed notes of {indexed} transaction(s).")
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user (default: everyone).')
+def rebuild_rollups_command(user_id):
+    """Backfill or repair the MonthlySummary rollup table."""
+    rows = rebuild_rollups(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt {rows} monthly summary row(s).")
+
+
+@click.command('archive-transactions')
+@with_appcontext
+@click.option('--months', type=int, default=None, help='Keep this many months live (default ARCHIVE_AFTER_MONTHS).')
+@click.option('--batch-size', type=int, default=None, help='Transactions moved per commit (default ARCHIVE_BATCH_SIZE).')
+def archive_transactions_command(months, batch_size):
+    """Move transactions of closed months into the archive table (run monthly from cron)."""
+    result = archive_closed_periods(months, batch_size)
+    click.echo(
+        f"Archived {result['archived']} transaction(s) of {result['users']} user(s) "
+        f"dated before {result['before']:%Y-%m-%d}."
+    )
+
+
+@click.command('prune-changes')
+@with_appcontext
+@click.option('--days', type=int, default=None, help='Keep this many days of sync history (default SYNC_RETENTION_DAYS).')
+def prune_changes_command(days):
+    """Delete old change-log rows; clients further behind resync from a snapshot."""
+    deleted = prune_change_log(days if days is not None else current_app.config['SYNC_RETENTION_DAYS'])
+    click.echo(f"Deleted {deleted} change-log row(s).")
+
+
+@click.command('send-mail')
+@with_appcontext
+@click.option('--batch-size', type=int, default=None, help='Messages per SMTP connection (default MAIL_BATCH_SIZE).')
+def send_mail_command(batch_size):
+    """Deliver every due message in the mail outbox (for cron when MAIL_OUTBOX_SENDER is off)."""
+    result = drain_outbox(batch_size)
+    click.echo(f"Sent {result['sent']} message(s), {result['retried']} to retry, {result['failed']} failed.")
+
+
+@click.command('prune-outbox')
+@with_appcontext
+@click.option('--days', type=int, default=None, help='Keep this many days of sent mail (default MAIL_OUTBOX_RETENTION_DAYS).')
+def prune_outbox_command(days):
+    """Delete old sent and failed outbox messages."""
+    deleted = prune_outbox(days if days is not None else current_app.config['MAIL_OUTBOX_RETENTION_DAYS'])
+    click.echo(f"Deleted {deleted} outbox message(s).")
+
+
+@click.command('create-indexes')
+@with_appcontext
+def create_indexes_command():
+    """Create any model indexes missing from an existing database."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    click.echo("Indexes are up to date.")
+
+
+COMMANDS = [
+    migrate_command,
+    import_csv_command,
+    materialize_recurring_command,
+    reindex_notes_command,
+    rebuild_rollups_command,
+    archive_transactions_command,
+    prune_changes_command,
+    send_mail_command,
+    prune_outbox_command,
+    create_indexes_command,
+]
+
+
+def register_commands(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -14,18 +14,88 @@ class Config:
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_NAME = os.getenv('DB_NAME', 'quickledger')
     
-    SQLALCHEMY_DATABASE_URI = f"mysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'SQLALCHEMY_DATABASE_URI',
+        f"mysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 280,
         'pool_pre_ping': True,
     }
-    
+
+    # Read replicas of the database above, comma separated. Chart APIs,
+    # exports and dashboard GETs read from them (see replicas.py)
+    REPLICA_DATABASE_URIS = [uri.strip() for uri in os.getenv('REPLICA_DATABASE_URIS', '').split(',') if uri.strip()]
+    SQLALCHEMY_BINDS = {f'replica{i}': uri for i, uri in enumerate(REPLICA_DATABASE_URIS)}
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))  # primary-only reads after a write
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+    REPLICA_RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_INTERVAL', 30))
+
     # Session
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+
+    # Pagination
+    TRANSACTIONS_PER_PAGE = int(os.getenv('TRANSACTIONS_PER_PAGE', 50))
+
+    # Batch API
+    BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', 500))
+
+    # Delta sync
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', 500))
+    SYNC_RETENTION_DAYS = int(os.getenv('SYNC_RETENTION_DAYS', 90))
+
+    # Chart API response cache: lru (per process), redis (shared) or none
+    CHART_CACHE_BACKEND = os.getenv('CHART_CACHE_BACKEND', 'lru')
+    CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', 1024))
+    CHART_CACHE_REDIS_URL = os.getenv('CHART_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CHART_CACHE_TTL = int(os.getenv('CHART_CACHE_TTL', 3600))
+
+    # Archival: `flask archive-transactions` (monthly from cron) moves transactions
+    # older than ARCHIVE_AFTER_MONTHS whole months into transaction_archive
+    ARCHIVE_AFTER_MONTHS = int(os.getenv('ARCHIVE_AFTER_MONTHS', 24))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+
+    # Background PDF reports
+    REPORT_DIR = os.getenv('REPORT_DIR')  # defaults to <instance>/reports
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
+    
+    # Recurring transactions: set RECURRING_SCHEDULER to run them in-process
+    # instead of (or as well as) `flask materialize-recurring` from cron
+    RECURRING_SCHEDULER = os.getenv('RECURRING_SCHEDULER', 'False') == 'True'
+    RECURRING_INTERVAL = int(os.getenv('RECURRING_INTERVAL', 3600))
+    
+    # Password hashing runs on a bounded pool; hashes made with another
+    # method or cost are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+    
+    # Auth rate limits, as "attempts/seconds" token buckets: memory, redis or none
+    RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_MEMORY_SIZE = int(os.getenv('RATELIMIT_MEMORY_SIZE', 100000))
+    RATELIMIT_REDIS_URL = os.getenv('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATELIMIT_AUTH_IP = os.getenv('RATELIMIT_AUTH_IP', '30/60')
+    # Failed logins on one account: from one client IP, and from every address together
+    RATELIMIT_AUTH_ACCOUNT = os.getenv('RATELIMIT_AUTH_ACCOUNT', '10/300')
+    RATELIMIT_AUTH_ACCOUNT_TOTAL = os.getenv('RATELIMIT_AUTH_ACCOUNT_TOTAL', '50/300')
+    
+    # Request instrumentation (see profiling.py); off unless PROFILING=True
+    PROFILING = os.getenv('PROFILING', 'False') == 'True'
+    PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', 500))
+    PROFILING_N_PLUS_ONE = int(os.getenv('PROFILING_N_PLUS_ONE', 5))
+    PROFILING_SAMPLE_ENDPOINTS = os.getenv('PROFILING_SAMPLE_ENDPOINTS', '')  # e.g. "transactions.dashboard,budgets.budgets"
+    PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', 5))  # milliseconds
+    PROFILING_SAMPLE_DIR = os.getenv('PROFILING_SAMPLE_DIR')  # defaults to <instance>/profiles
+    
+    # /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it is a 404
+    # unless METRICS_PUBLIC=True (e.g. when only a private network can reach the app)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', 'False') == 'True'
     
     # Mail Configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -34,6 +104,18 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_USERNAME')
+    
+    # Mail outbox: requests only enqueue, MAIL_SENDER_WORKERS threads per process
+    # (or `flask send-mail` from cron with MAIL_OUTBOX_SENDER=False) deliver
+    MAIL_OUTBOX_SENDER = os.getenv('MAIL_OUTBOX_SENDER', 'True') == 'True'
+    MAIL_SENDER_WORKERS = int(os.getenv('MAIL_SENDER_WORKERS', 1))
+    MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', 50))
+    MAIL_POLL_INTERVAL = int(os.getenv('MAIL_POLL_INTERVAL', 10))
+    MAIL_SEND_LEASE = int(os.getenv('MAIL_SEND_LEASE', 300))
+    MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 8))
+    MAIL_RETRY_BACKOFF = int(os.getenv('MAIL_RETRY_BACKOFF', 30))
+    MAIL_RETRY_MAX_BACKOFF = int(os.getenv('MAIL_RETRY_MAX_BACKOFF', 3600))
+    MAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('MAIL_OUTBOX_RETENTION_DAYS', 30))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
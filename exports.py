@@ -0,0 +1,105 @@
+import csv
+import io
+import zlib
+
+from models import db, User, Category
+from aggregates import ledger_rows, ledger_summary
+
+CSV_HEADER = ["ID", "Amount", "Category", "Note", "Date"]
+
+
+def iter_csv(user_id, start_date=None, end_date=None, search_note=None, compress=False, chunk_size=1000):
+    """Stream a user's transactions as CSV, newest first.
+
+    Rows are read from a server-side cursor ``chunk_size`` at a time and
+    written through csv.writer, so memory stays flat however long the
+    history is. Archived transactions are included. With ``compress`` the
+    output is a gzip stream.
+    """
+    ledger = ledger_rows(user_id, start_date, end_date, search_note)
+    query = (
+        db.session.query(ledger.c.id, ledger.c.amount, Category.name, ledger.c.note, ledger.c.timestamp)
+        .join(Category, Category.id == ledger.c.category_id)
+        .order_by(ledger.c.timestamp.desc(), ledger.c.id.desc())
+        .yield_per(chunk_size)
+    )
+
+    gzipper = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return gzipper.compress(data) if gzipper else data
+
+    writer.writerow(CSV_HEADER)
+    pending = 0
+    for txn_id, amount, category, note, timestamp in query:
+        writer.writerow([txn_id, amount, category, note or '', timestamp.strftime("%Y-%m-%d %H:%M")])
+        pending += 1
+        if pending >= chunk_size:
+            yield flush()
+            pending = 0
+
+    tail = flush()
+    if gzipper:
+        tail += gzipper.flush()
+    if tail:
+        yield tail
+
+
+def render_pdf(user_id, fileobj, chunk_size=1000):
+    """Draw a user's QuickLedger report into ``fileobj``.
+
+    Transactions are streamed like the CSV export, so rendering a large
+    account does not hold its whole history in memory.
+    """
+    # ReportLab is only needed here, so it is not loaded until the first report
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    email = db.session.query(User.email).filter_by(id=user_id).scalar()
+    summary = ledger_summary(user_id)
+    ledger = ledger_rows(user_id)
+    transactions = (
+        db.session.query(ledger.c.amount, Category.name, ledger.c.note, ledger.c.timestamp)
+        .join(Category, Category.id == ledger.c.category_id)
+        .order_by(ledger.c.timestamp.desc(), ledger.c.id.desc())
+        .yield_per(chunk_size)
+    )
+
+    pdf = canvas.Canvas(fileobj, pagesize=letter)
+    width, height = letter
+
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(200, height - 50, "QuickLedger Report")
+
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(50, height - 100, f"User: {email}")
+    pdf.drawString(50, height - 120, f"Total Income: ₹ {summary['income']}")
+    pdf.drawString(50, height - 140, f"Total Expense: ₹ {summary['expense']}")
+    pdf.drawString(50, height - 160, f"Balance: ₹ {summary['balance']}")
+
+    y = height - 200
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(50, y, "Amount")
+    pdf.drawString(150, y, "Category")
+    pdf.drawString(250, y, "Note")
+    pdf.drawString(400, y, "Date")
+    y -= 20
+
+    pdf.setFont("Helvetica", 10)
+    for amount, category, note, timestamp in transactions:
+        pdf.drawString(50, y, f"₹ {amount}")
+        pdf.drawString(150, y, category)
+        pdf.drawString(250, y, note or "-")
+        pdf.drawString(400, y, timestamp.strftime("%Y-%m-%d"))
+        y -= 20
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 10)
+            y = height - 50
+
+    pdf.save()
@@ -0,0 +1,50 @@
+"""gunicorn settings: ``gunicorn -c gunicorn.conf.py``.
+
+Builds the app once in the master (GUNICORN_PRELOAD, on by default) and
+forks the workers from it, so they share its memory copy-on-write instead
+of each importing and building their own. Enables multiprocess Prometheus
+metrics when PROMETHEUS_MULTIPROC_DIR is set (see metrics.py).
+"""
+import gc
+import os
+import shutil
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # A preloaded app creates its metric files before on_starting runs
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def on_starting(server):
+    # Samples left by a previous run would otherwise be added to this one's
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from app import preload_heavy_modules
+        preload_heavy_modules()
+        # Keep the collector from touching (and so copying) the master's objects in every worker
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # A connection the master opened must not be shared by several workers
+        from models import db
+        with server.app.wsgi().app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,187 @@
+import csv
+from datetime import timezone
+from decimal import Decimal
+
+from dateutil import parser as date_parser
+
+from models import db, User, Transaction, ArchivedTransaction, Category, ChangeLog, transaction_hash, validate_amount
+from rollups import add_rows_to_rollup
+
+# Header aliases accepted for each field, covering our own CSV export and
+# the usual bank statement layouts. Matching is case-insensitive.
+COLUMN_ALIASES = {
+    'date': ('date', 'transaction date', 'txn date', 'posted date', 'posting date', 'value date'),
+    'amount': ('amount', 'transaction amount'),
+    'debit': ('debit', 'withdrawal', 'withdrawal amt.', 'withdrawal amount', 'paid out'),
+    'credit': ('credit', 'deposit', 'deposit amt.', 'deposit amount', 'paid in'),
+    'category': ('category',),
+    'note': ('note', 'description', 'narration', 'memo', 'details', 'particulars', 'remarks'),
+}
+
+# Used when a row has no category column; a credit counts as income
+DEFAULT_EXPENSE_CATEGORY = 'Other'
+DEFAULT_INCOME_CATEGORY = 'Other Income'
+
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be imported at all, e.g. required columns are missing."""
+
+
+def _map_columns(header):
+    normalized = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for index, name in enumerate(normalized):
+            if name in aliases:
+                columns[field] = index
+                break
+
+    if 'date' not in columns:
+        raise ImportFormatError("No date column found.")
+    if 'amount' not in columns and not ('debit' in columns or 'credit' in columns):
+        raise ImportFormatError("No amount (or debit/credit) column found.")
+    return columns
+
+
+def _parse_amount(value):
+    value = (value or '').strip().replace(',', '').replace('₹', '')
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    return validate_amount(value) if value else Decimal('0.00')
+
+
+def _parse_row(row, columns, dayfirst):
+    """Return (timestamp, signed amount, category name or None, note) for one CSV row."""
+    def cell(field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    timestamp = date_parser.parse(cell('date'), dayfirst=dayfirst)
+    if timestamp.tzinfo is not None:
+        # Stored naive in UTC, like datetime.utcnow()
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if 'amount' in columns:
+        amount = _parse_amount(cell('amount'))
+    else:
+        amount = validate_amount(_parse_amount(cell('credit')) - _parse_amount(cell('debit')))
+    if amount == 0:
+        raise ValueError("amount is zero or missing")
+
+    return timestamp, amount, cell('category') or None, cell('note')[:200]
+
+
+class CategoryResolver:
+    """Maps imported category names onto the user's categories, creating missing ones."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.by_name = {c.name.lower(): c for c in Category.query.filter_by(user_id=user_id)}
+        self.created = []
+
+    def resolve(self, name, is_credit):
+        if not name:
+            name = DEFAULT_INCOME_CATEGORY if is_credit else DEFAULT_EXPENSE_CATEGORY
+        name = name[:50]
+
+        category = self.by_name.get(name.lower())
+        if category is None:
+            category = Category(
+                name=name,
+                type='Income' if is_credit else 'Expense',
+                user_id=self.user_id
+            )
+            db.session.add(category)
+            db.session.flush()
+            self.by_name[name.lower()] = category
+            self.created.append(name)
+        return category
+
+
+def import_csv(user_id, stream, dayfirst=False, batch_size=1000):
+    """Import transactions for a user from a text stream of CSV data.
+
+    Rows are parsed and validated ``batch_size`` at a time. Each valid batch
+    is bulk-inserted and committed on its own, together with its rollup and
+    data-version updates. A row whose content hash matches an existing
+    transaction, live or archived (or an earlier row of the same batch), is
+    skipped.
+
+    Money in is a positive amount (or the credit column). A category that
+    already exists keeps its own type. New categories are Income for money
+    in and Expense for money out, and so are the defaults used when the file
+    has no category column. Amounts are stored as positive values.
+
+    Returns a summary dict with imported/duplicates counts, created
+    categories and per-line errors (the first MAX_REPORTED_ERRORS).
+    """
+    reader = csv.reader(stream)
+    try:
+        columns = _map_columns(next(reader))
+    except StopIteration:
+        raise ImportFormatError("The file is empty.")
+
+    resolver = CategoryResolver(user_id)
+    result = {'imported': 0, 'duplicates': 0, 'errors': [], 'error_count': 0, 'created_categories': resolver.created}
+    batch = []
+
+    def flush_batch():
+        if not batch:
+            return
+        hashes = [row['content_hash'] for row in batch]
+        existing = {
+            h for model in (Transaction, ArchivedTransaction) for (h,) in db.session.query(model.content_hash)
+            .filter(model.user_id == user_id, model.content_hash.in_(hashes))
+        }
+
+        new_rows = []
+        for row in batch:
+            if row['content_hash'] in existing:
+                result['duplicates'] += 1
+                continue
+            existing.add(row['content_hash'])
+            new_rows.append(row)
+
+        if new_rows:
+            db.session.execute(db.insert(Transaction), new_rows)
+            new_ids = db.session.query(Transaction.id).filter(
+                Transaction.user_id == user_id,
+                Transaction.content_hash.in_([row['content_hash'] for row in new_rows])
+            )
+            ChangeLog.record(user_id, 'transaction', [txn_id for (txn_id,) in new_ids])
+            add_rows_to_rollup(user_id, new_rows)
+            User.bump_data_version(user_id)
+        db.session.commit()
+        result['imported'] += len(new_rows)
+        batch.clear()
+
+    for line_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            timestamp, amount, category_name, note = _parse_row(row, columns, dayfirst)
+        except (ValueError, OverflowError) as e:
+            result['error_count'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'line': line_number, 'error': str(e)})
+            continue
+
+        category = resolver.resolve(category_name, is_credit=amount > 0)
+        amount = abs(amount)
+
+        batch.append({
+            'user_id': user_id,
+            'amount': amount,
+            'category_id': category.id,
+            'note': note,
+            'timestamp': timestamp,
+            'is_recurring': False,
+            'content_hash': transaction_hash(timestamp, amount, category.id, note),
+        })
+        if len(batch) >= batch_size:
+            flush_batch()
+
+    flush_batch()
+    return result
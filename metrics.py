@@ -0,0 +1,146 @@
+"""Prometheus metrics, served at /metrics.
+
+Under gunicorn, point PROMETHEUS_MULTIPROC_DIR at an empty directory
+before the workers start (gunicorn.conf.py clears it on startup and marks
+dead workers). Every worker then writes its samples there, and whichever
+worker answers /metrics reports the totals for all of them. Without the
+variable, the metrics are those of the current process only.
+"""
+import os
+import secrets
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import event
+
+from models import db
+
+REQUEST_LATENCY = Histogram(
+    'quickledger_http_request_duration_seconds', 'Request latency by route',
+    ['method', 'endpoint', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'quickledger_db_pool_checkout_wait_seconds', 'Time spent getting a connection from the pool, connecting included',
+    ['bind'], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'quickledger_db_pool_checked_out', 'Connections currently checked out of the pool', ['bind'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_CAPACITY = Gauge(
+    'quickledger_db_pool_capacity', 'Pool size plus allowed overflow', ['bind'], multiprocess_mode='livesum'
+)
+CACHE_REQUESTS = Counter(
+    'quickledger_cache_requests_total', 'Response cache lookups by result (hit, miss or not_modified)',
+    ['cache', 'result']
+)
+EXPORT_BYTES = Counter('quickledger_export_bytes_total', 'Bytes produced by exports', ['format'])
+EXPORT_DURATION = Histogram(
+    'quickledger_export_duration_seconds', 'Time to produce an export', ['format'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+
+def measured_stream(export_format, chunks):
+    """Pass a streamed export through, recording its size and duration when it ends or is abandoned."""
+    started = time.perf_counter()
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        record_export(export_format, size, time.perf_counter() - started)
+
+
+def record_export(export_format, size, seconds):
+    EXPORT_BYTES.labels(export_format).inc(size)
+    EXPORT_DURATION.labels(export_format).observe(seconds)
+
+
+def _instrument_pool(pool, bind):
+    """Time QueuePool._do_get, where a checkout waits for a free connection.
+
+    SQLAlchemy has no event before a checkout, so the pool instance's
+    method is wrapped; pools without one (e.g. SQLite's static pools)
+    only report the gauges.
+    """
+    get = getattr(pool, '_do_get', None)
+    if get is None or getattr(pool, '_metrics_instrumented', False):
+        return
+
+    def timed_get():
+        started = time.perf_counter()
+        try:
+            return get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(bind).observe(time.perf_counter() - started)
+
+    pool._do_get = timed_get
+    pool._metrics_instrumented = True
+    if hasattr(pool, 'size') and hasattr(pool, '_max_overflow'):
+        DB_POOL_CAPACITY.labels(bind).set(pool.size() + max(pool._max_overflow, 0))
+
+
+def _instrument_engine(engine, bind):
+    _instrument_pool(engine.pool, bind)
+
+    def on_checkout(*args):
+        if hasattr(engine.pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.labels(bind).set(engine.pool.checkedout())
+
+    def on_checkin(*args):
+        # Fired just before the connection goes back, so it is still counted
+        if hasattr(engine.pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.labels(bind).set(max(engine.pool.checkedout() - 1, 0))
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+    # dispose() swaps in a fresh pool object, which needs wrapping again
+    event.listen(engine, 'engine_disposed', lambda engine: _instrument_pool(engine.pool, bind))
+
+
+def init_metrics(app):
+    with app.app_context():
+        for key, engine in db.engines.items():
+            _instrument_engine(engine, key or 'primary')
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_LATENCY.labels(
+                request.method, request.endpoint or 'unmatched', response.status_code
+            ).observe(time.perf_counter() - started)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+    if not token and not current_app.config['METRICS_PUBLIC']:
+        return jsonify({'error': 'Not found'}), 404
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
+
+
+def metrics_payload():
+    """(body, content type) of the current metrics, aggregated across workers in multiprocess mode."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
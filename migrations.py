@@ -0,0 +1,315 @@
+"""Schema migrations for databases created by older versions of QuickLedger.
+
+db.create_all() only creates missing tables, so changes to existing tables
+live here. Every migration inspects the live schema first and does nothing
+if it has already been applied, which makes ``flask migrate`` safe to run
+on every deploy.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, cast, column, exists, func, inspect, literal, select, table, text
+
+from models import (
+    db, Transaction, ArchivedTransaction, Category, Budget, MonthlySummary, NoteToken,
+    DEFAULT_RECURRENCE, RECURRENCE_RULES, next_recurrence, transaction_hash
+)
+from rollups import rebuild_rollups
+from search import reindex_notes
+
+
+def _columns(table_name):
+    return {col['name'] for col in inspect(db.engine).get_columns(table_name)}
+
+
+def _quote(name):
+    return db.engine.dialect.identifier_preparer.quote(name)
+
+
+def _drop_index(table_name, index_name):
+    if index_name not in {ix['name'] for ix in inspect(db.engine).get_indexes(table_name)}:
+        return
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(f"DROP INDEX {_quote(index_name)} ON {_quote(table_name)}"))
+    else:
+        db.session.execute(text(f"DROP INDEX {_quote(index_name)}"))
+
+
+def _to_minor_units(table_name, old_name, new_name):
+    """Replace the float column ``old_name`` with ``new_name``, a BIGINT count of minor units."""
+    legacy = table(table_name, column(old_name), column(new_name))
+    quoted = _quote(table_name)
+
+    db.session.execute(text(f"ALTER TABLE {quoted} ADD COLUMN {new_name} BIGINT NULL"))
+    # Rounding absorbs the float error, e.g. 0.30000000000000004 * 100
+    db.session.execute(legacy.update().values({
+        new_name: cast(func.round(legacy.c[old_name] * 100), BigInteger)
+    }))
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(f"ALTER TABLE {quoted} MODIFY {new_name} BIGINT NOT NULL"))
+    db.session.execute(text(f"ALTER TABLE {quoted} DROP COLUMN {old_name}"))
+
+
+def _add_category_id(table_name, legacy_indexes):
+    """Replace ``table_name.category`` (a name) with ``category_id`` (a foreign key).
+
+    Any name without a matching Category row gets one created as an
+    Expense category so that no row is left without a category.
+    """
+    legacy = table(table_name, column('id'), column('user_id'), column('category'), column('category_id'))
+    categories = table('category', column('id'), column('user_id'), column('name'), column('type'), column('color'))
+    quoted = _quote(table_name)
+
+    missing = (
+        select(legacy.c.category, literal('Expense'), legacy.c.user_id, literal('#6c757d'))
+        .where(~exists().where(
+            categories.c.user_id == legacy.c.user_id,
+            categories.c.name == legacy.c.category
+        ))
+        .distinct()
+    )
+    db.session.execute(categories.insert().from_select(['name', 'type', 'user_id', 'color'], missing))
+
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(
+            f"ALTER TABLE {quoted} ADD COLUMN category_id INTEGER NULL, "
+            f"ADD FOREIGN KEY (category_id) REFERENCES category (id)"
+        ))
+    else:
+        db.session.execute(text(f"ALTER TABLE {quoted} ADD COLUMN category_id INTEGER REFERENCES category (id)"))
+
+    db.session.execute(
+        legacy.update().values(category_id=(
+            select(categories.c.id)
+            .where(categories.c.user_id == legacy.c.user_id, categories.c.name == legacy.c.category)
+            .order_by(categories.c.id)
+            .limit(1)
+            .scalar_subquery()
+        ))
+    )
+
+    for index_name in legacy_indexes:
+        _drop_index(table_name, index_name)
+    db.session.execute(text(f"ALTER TABLE {quoted} DROP COLUMN category"))
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(f"ALTER TABLE {quoted} MODIFY category_id INTEGER NOT NULL"))
+
+
+def migrate_amount_cents():
+    """Store amounts as integer minor units (``amount_cents``) instead of floats.
+
+    Runs before the other migrations, which read amounts through the models.
+    """
+    pending = [
+        table_name for table_name in ('transaction', 'transaction_archive', 'budget')
+        if 'amount_cents' not in _columns(table_name)
+    ]
+    rollup_stale = 'total_cents' not in _columns('monthly_summary')
+    if not pending and not rollup_stale:
+        return False
+
+    for table_name in pending:
+        _to_minor_units(table_name, 'amount', 'amount_cents')
+    db.session.commit()
+
+    if rollup_stale:
+        MonthlySummary.__table__.drop(db.engine, checkfirst=True)
+        MonthlySummary.__table__.create(db.engine)
+        # Databases without category_id get their rollup from migrate_category_ids()
+        if 'category_id' in _columns('transaction'):
+            rebuild_rollups()
+        db.session.commit()
+    return True
+
+
+def migrate_category_ids():
+    """Normalize Transaction.category and Budget.category into category_id foreign keys."""
+    if 'category_id' in _columns('transaction') and 'category_id' in _columns('budget'):
+        return False
+
+    if 'category_id' not in _columns('transaction'):
+        _add_category_id('transaction', ['ix_transaction_user_category_timestamp'])
+    if 'category_id' not in _columns('budget'):
+        _add_category_id('budget', ['ix_budget_user_period_category'])
+    db.session.commit()
+
+    for model, index_name in (
+        (Transaction, 'ix_transaction_user_category_timestamp'),
+        (Budget, 'ix_budget_user_period_category'),
+        (Category, 'ix_category_user_name'),
+    ):
+        index = next(ix for ix in model.__table__.indexes if ix.name == index_name)
+        index.create(db.engine, checkfirst=True)
+
+    # The rollup is derived data keyed by category; rebuild it from scratch
+    MonthlySummary.__table__.drop(db.engine, checkfirst=True)
+    MonthlySummary.__table__.create(db.engine)
+    rebuild_rollups()
+    db.session.commit()
+    return True
+
+
+def migrate_user_data_version():
+    """Add User.data_version, used to invalidate cached reports."""
+    if 'data_version' in _columns('user'):
+        return False
+
+    db.session.execute(text(f"ALTER TABLE {_quote('user')} ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+    db.session.commit()
+    return True
+
+
+def migrate_transaction_content_hash(batch_size=1000):
+    """Add and backfill Transaction.content_hash, used to skip duplicate imports."""
+    if 'content_hash' in _columns('transaction'):
+        return False
+
+    db.session.execute(text(f"ALTER TABLE {_quote('transaction')} ADD COLUMN content_hash VARCHAR(64)"))
+    db.session.commit()
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Transaction.id, Transaction.timestamp, Transaction.amount, Transaction.category_id, Transaction.note)
+            .where(Transaction.id > last_id)
+            .order_by(Transaction.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(db.update(Transaction), [
+            {'id': row.id, 'content_hash': transaction_hash(row.timestamp, row.amount, row.category_id, row.note)}
+            for row in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1].id
+
+    index = next(ix for ix in Transaction.__table__.indexes if ix.name == 'ix_transaction_user_hash')
+    index.create(db.engine, checkfirst=True)
+    return True
+
+
+def migrate_recurring_schedule():
+    """Add the recurring-transaction watermark and source columns.
+
+    Existing templates are scheduled from their next future occurrence
+    rather than their start date. Past occurrences may already have been
+    entered by hand, so they are not backfilled.
+    """
+    if 'next_occurrence' in _columns('transaction'):
+        return False
+
+    quoted = _quote('transaction')
+    db.session.execute(text(f"ALTER TABLE {quoted} ADD COLUMN next_occurrence DATETIME NULL"))
+    if db.engine.dialect.name == 'mysql':
+        db.session.execute(text(
+            f"ALTER TABLE {quoted} ADD COLUMN recurring_source_id INTEGER NULL, "
+            f"ADD FOREIGN KEY (recurring_source_id) REFERENCES {quoted} (id) ON DELETE SET NULL"
+        ))
+    else:
+        db.session.execute(text(
+            f"ALTER TABLE {quoted} ADD COLUMN recurring_source_id INTEGER REFERENCES {quoted} (id) ON DELETE SET NULL"
+        ))
+    db.session.commit()
+
+    now = datetime.utcnow()
+    templates = db.session.execute(
+        select(Transaction.id, Transaction.timestamp, Transaction.recurrence_type)
+        .where(Transaction.is_recurring.is_(True))
+    ).all()
+    if templates:
+        db.session.execute(db.update(Transaction), [
+            {
+                'id': row.id,
+                'next_occurrence': next_recurrence(
+                    row.timestamp,
+                    row.recurrence_type if row.recurrence_type in RECURRENCE_RULES else DEFAULT_RECURRENCE,
+                    max(row.timestamp, now)
+                )
+            }
+            for row in templates
+        ])
+        db.session.commit()
+
+    index = next(ix for ix in Transaction.__table__.indexes if ix.name == 'ix_transaction_next_occurrence')
+    index.create(db.engine, checkfirst=True)
+    return True
+
+
+def migrate_note_search():
+    """Build the note search index: FULLTEXT on MySQL, the NoteToken table elsewhere."""
+    if db.engine.dialect.name == 'mysql':
+        if 'ft_transaction_note' in {ix['name'] for ix in inspect(db.engine).get_indexes('transaction')}:
+            return False
+        index = next(ix for ix in Transaction.__table__.indexes if ix.name == 'ft_transaction_note')
+        index.create(db.engine)
+        return True
+
+    if db.session.query(NoteToken.transaction_id).first() is not None:
+        return False
+    if db.session.query(Transaction.id).filter(Transaction.note.isnot(None), Transaction.note != '').first() is None:
+        return False
+    reindex_notes()
+    return True
+
+
+def migrate_report_email():
+    """Add ReportJob.email_to, the address a finished report is mailed to."""
+    if 'email_to' in _columns('report_job'):
+        return False
+
+    db.session.execute(text("ALTER TABLE report_job ADD COLUMN email_to VARCHAR(120)"))
+    db.session.commit()
+    return True
+
+
+def migrate_transaction_autoincrement():
+    """Rebuild the SQLite transaction table as AUTOINCREMENT, so deleted and archived ids are never reissued.
+
+    SQLite cannot alter a primary key in place, so the table is renamed,
+    recreated from the model and copied back. The id sequence then starts
+    above every live and archived id. MySQL 8 persists its counter already.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transaction'")).scalar()
+    if 'AUTOINCREMENT' in sql.upper():
+        return False
+
+    # Keep the foreign keys of other tables pointing at "transaction" through the rename
+    db.session.execute(text("PRAGMA legacy_alter_table = ON"))
+    db.session.execute(text(f"ALTER TABLE {_quote('transaction')} RENAME TO transaction_legacy"))
+    for index in inspect(db.session.connection()).get_indexes('transaction_legacy'):
+        db.session.execute(text(f"DROP INDEX {_quote(index['name'])}"))
+    Transaction.__table__.create(db.session.connection())
+
+    columns = ', '.join(_quote(col.name) for col in Transaction.__table__.columns)
+    db.session.execute(text(f"INSERT INTO {_quote('transaction')} ({columns}) SELECT {columns} FROM transaction_legacy"))
+    db.session.execute(text("DROP TABLE transaction_legacy"))
+    db.session.execute(text("PRAGMA legacy_alter_table = OFF"))
+
+    top = max(
+        db.session.execute(select(func.max(Transaction.id))).scalar() or 0,
+        db.session.execute(select(func.max(ArchivedTransaction.id))).scalar() or 0
+    )
+    db.session.execute(text("DELETE FROM sqlite_sequence WHERE name = 'transaction'"))
+    db.session.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('transaction', :top)"), {'top': top})
+    db.session.commit()
+    return True
+
+
+MIGRATIONS = [
+    migrate_amount_cents,
+    migrate_category_ids,
+    migrate_user_data_version,
+    migrate_transaction_content_hash,
+    migrate_recurring_schedule,
+    migrate_note_search,
+    migrate_report_email,
+    migrate_transaction_autoincrement,
+]
+
+
+def run_migrations():
+    """Apply every pending migration in order. Returns the names of those applied."""
+    db.create_all()
+    return [migration.__name__ for migration in MIGRATIONS if migration()]
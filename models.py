@@ -0,0 +1,408 @@
+import calendar
+import hashlib
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import Session
+
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+MINOR_UNIT = Decimal('0.01')  # paise; every amount is a whole number of them
+# Largest amount a BIGINT count of minor units can hold
+MAX_STORABLE = Decimal(2 ** 63 - 1) * MINOR_UNIT
+# Largest amount a user may enter, far below MAX_STORABLE so that rollup sums of them still fit
+MAX_AMOUNT = Decimal('999999999999.99')
+
+
+def money(value):
+    """``value`` (a number or numeric string) as a Decimal rounded half up to whole minor units.
+
+    Raises ValueError for anything that is not a finite number or does not
+    fit a BIGINT of minor units. Validate user input with validate_amount().
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"{value!r} is not a number")
+    if not amount.is_finite():
+        raise ValueError(f"{value!r} is not a finite number")
+    if abs(amount) > MAX_STORABLE:
+        raise ValueError(f"{value!r} does not fit in minor units")
+    return amount.quantize(MINOR_UNIT, ROUND_HALF_UP)
+
+
+def validate_amount(value):
+    """money() for an amount entered by a user, which must also be within MAX_AMOUNT.
+
+    Raises ValueError for anything else.
+    """
+    amount = money(value)
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"{value!r} is out of range")
+    return amount
+
+
+class Money(db.TypeDecorator):
+    """A currency amount stored as a BIGINT count of minor units.
+
+    Python sees a two-place Decimal; floats and strings are rounded with
+    money() on the way in. SUM() over a Money column adds integers in the
+    database (MySQL widens it to DECIMAL, so it cannot overflow) and comes
+    back as a Money Decimal too, so totals are exact.
+    """
+    impl = db.BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(money(value) / MINOR_UNIT)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)) * MINOR_UNIT
+
+
+# =====================
+# Database Models
+# =====================
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    reset_token = db.Column(db.String(200), nullable=True)
+    token_expiry = db.Column(db.DateTime, nullable=True)
+    data_version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every ledger write
+    transactions = db.relationship('Transaction', backref='user', lazy=True)
+
+    @staticmethod
+    def bump_data_version(user_id):
+        """Mark a user's ledger as changed, invalidating anything cached for it."""
+        User.query.filter_by(id=user_id).update(
+            {User.data_version: User.data_version + 1},
+            synchronize_session=False
+        )
+        db.session.info.setdefault('bumped_users', set()).add(user_id)
+
+
+class Transaction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    amount = db.Column('amount_cents', Money, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    note = db.Column(db.String(200))
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_recurring = db.Column(db.Boolean, default=False)
+    recurrence_type = db.Column(db.String(20))  # monthly, weekly, yearly
+    content_hash = db.Column(db.String(64))  # see transaction_hash(), used to skip duplicate imports
+    next_occurrence = db.Column(db.DateTime)  # recurring templates only: next copy to materialize
+    recurring_source_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='SET NULL'))
+    category = db.relationship('Category')
+
+    is_archived = False
+
+    __table_args__ = (
+        db.Index('ix_transaction_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_transaction_user_category_timestamp', 'user_id', 'category_id', 'timestamp'),
+        db.Index('ix_transaction_user_hash', 'user_id', 'content_hash'),
+        db.Index('ix_transaction_next_occurrence', 'next_occurrence'),
+        db.Index('ft_transaction_note', 'note', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        # Never hand out an id again once its row is deleted or archived (MySQL 8 persists the counter)
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ArchivedTransaction(db.Model):
+    """A transaction from a closed period, moved out of Transaction by archive.py.
+
+    Archived rows keep their id and are read-only: exports, search and the
+    filtered totals read them together with the live table, and their
+    months stay in MonthlySummary. On MySQL the table is RANGE partitioned
+    by year of ``timestamp``. Partitioned InnoDB tables allow no foreign
+    keys and no FULLTEXT index, so ``timestamp`` is part of the primary
+    key, the user and category references are plain columns, and notes are
+    searched through ArchivedNoteToken on every database.
+    """
+    __tablename__ = 'transaction_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column('amount_cents', Money, nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    note = db.Column(db.String(200))
+    content_hash = db.Column(db.String(64))
+    recurring_source_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    category = db.relationship('Category', primaryjoin='foreign(ArchivedTransaction.category_id) == Category.id', viewonly=True)
+
+    is_recurring = False  # recurring templates are never archived
+    is_archived = True
+
+    __table_args__ = (
+        db.Index('ix_transaction_archive_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_transaction_archive_user_hash', 'user_id', 'content_hash'),
+    )
+
+
+# Every year archive.py moves rows into gets its own partition, split off the catch-all one
+db.event.listen(ArchivedTransaction.__table__, 'after_create', db.DDL(
+    "ALTER TABLE transaction_archive PARTITION BY RANGE COLUMNS(`timestamp`) "
+    "(PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+).execute_if(dialect='mysql'))
+
+
+def transaction_hash(timestamp, amount, category_id, note):
+    """Content fingerprint of a transaction, at the minute precision used by the CSV export."""
+    raw = f"{timestamp:%Y-%m-%d %H:%M}|{money(amount)}|{category_id}|{note or ''}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+RECURRENCE_RULES = ('weekly', 'monthly', 'yearly')
+DEFAULT_RECURRENCE = 'monthly'
+
+
+def _add_months(anchor, months):
+    year, month = divmod(anchor.month - 1 + months, 12)
+    year += anchor.year
+    day = min(anchor.day, calendar.monthrange(year, month + 1)[1])
+    return anchor.replace(year=year, month=month + 1, day=day)
+
+
+def next_recurrence(anchor, rule, after):
+    """First occurrence of ``rule`` counted from ``anchor`` that falls strictly after ``after``.
+
+    Occurrences are always computed from the anchor, so a monthly rule on the
+    31st lands on the last day of shorter months without drifting.
+    """
+    if rule == 'weekly':
+        weeks = max((after - anchor) // timedelta(weeks=1) + 1, 1)
+        return anchor + timedelta(weeks=weeks)
+
+    step = 12 if rule == 'yearly' else 1
+    n = max(((after.year - anchor.year) * 12 + after.month - anchor.month) // step, 1)
+    while _add_months(anchor, n * step) <= after:
+        n += 1
+    return _add_months(anchor, n * step)
+
+
+@db.event.listens_for(Transaction, 'before_insert')
+@db.event.listens_for(Transaction, 'before_update')
+def _set_content_hash(mapper, connection, target):
+    if target.timestamp is None:
+        target.timestamp = datetime.utcnow()
+    target.content_hash = transaction_hash(target.timestamp, target.amount, target.category_id, target.note)
+
+    # Keep the recurrence schedule in step with the template's flags
+    if not target.is_recurring:
+        target.next_occurrence = None
+    elif target.next_occurrence is None:
+        rule = target.recurrence_type or DEFAULT_RECURRENCE
+        target.next_occurrence = next_recurrence(target.timestamp, rule, target.timestamp)
+
+
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    type = db.Column(db.String(20), nullable=False)  # Income or Expense
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    color = db.Column(db.String(7), default='#6c757d')  # Hex color for charts
+
+    __table_args__ = (
+        db.Index('ix_category_user_name', 'user_id', 'name'),
+    )
+
+
+class Budget(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    amount = db.Column('amount_cents', Money, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    year = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.relationship('Category')
+
+    __table_args__ = (
+        db.Index('ix_budget_user_period_category', 'user_id', 'year', 'month', 'category_id'),
+    )
+
+
+class MonthlySummary(db.Model):
+    """Per-user, per-category monthly totals maintained alongside Transaction writes."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)  # 1-12
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    total = db.Column('total_cents', Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ReportJob(db.Model):
+    """A PDF report rendered in the background, reused until the user's data changes."""
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, done, failed
+    data_version = db.Column(db.Integer, nullable=False)
+    path = db.Column(db.String(255))
+    error = db.Column(db.String(255))
+    email_to = db.Column(db.String(120))  # mail the PDF here once it is rendered
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_report_job_user_version', 'user_id', 'data_version'),
+    )
+
+
+class OutboxMessage(db.Model):
+    """An outgoing email, written by the request and delivered by outbox.py's sender pool.
+
+    ``next_attempt_at`` is when the message is next due: the retry time of
+    a pending message, or the lease expiry of one being sent, after which
+    another sender may pick it up again.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    attachment_path = db.Column(db.String(255))
+    attachment_name = db.Column(db.String(100))
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_due', 'status', 'next_attempt_at'),
+    )
+
+
+class ChangeLog(db.Model):
+    """One row per changed Transaction, Category or Budget, read by /api/sync.
+
+    Rows are written at commit time and stamped with the user's data_version,
+    which is bumped under the user's row lock, so versions become visible in
+    order. A delete is kept as a tombstone (op='delete').
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # transaction, category, budget
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # upsert or delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_change_log_user_version', 'user_id', 'version', 'id'),
+        db.Index('ix_change_log_changed_at', 'changed_at'),
+    )
+
+    @staticmethod
+    def record(user_id, entity, entity_ids, op='upsert'):
+        """Log changes made outside the ORM unit of work, e.g. bulk inserts."""
+        pending = db.session.info.setdefault('pending_changes', {})
+        for entity_id in entity_ids:
+            pending[(user_id, entity, entity_id)] = op
+
+
+class NoteToken(db.Model):
+    """Word index over Transaction.note, used by search.py where MySQL FULLTEXT is unavailable."""
+    user_id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(50), primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_note_token_transaction', 'transaction_id'),
+    )
+
+
+class ArchivedNoteToken(db.Model):
+    """Word index over ArchivedTransaction.note, the archive's counterpart of NoteToken."""
+    user_id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(50), primary_key=True)
+    transaction_id = db.Column(db.Integer, primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_archived_note_token_transaction', 'transaction_id'),
+    )
+
+
+def note_tokens(note):
+    """Distinct lower-cased words of a note, as stored in NoteToken."""
+    return {word[:50] for word in re.findall(r'\w+', (note or '').lower())}
+
+
+def index_note_tokens(session, transaction_ids, chunk_size=500, model=None, token_model=None):
+    """Rewrite the NoteToken rows of the given transactions from their current notes.
+
+    Pass ``model=ArchivedTransaction, token_model=ArchivedNoteToken`` to
+    index archived transactions instead.
+    """
+    model = model or Transaction
+    token_model = token_model or NoteToken
+    transaction_ids = list(transaction_ids)
+    for i in range(0, len(transaction_ids), chunk_size):
+        chunk = transaction_ids[i:i + chunk_size]
+        session.execute(db.delete(token_model).where(token_model.transaction_id.in_(chunk)))
+        rows = session.execute(
+            db.select(model.id, model.user_id, model.note).where(model.id.in_(chunk))
+        ).all()
+        tokens = [
+            {'user_id': row.user_id, 'token': token, 'transaction_id': row.id}
+            for row in rows for token in note_tokens(row.note)
+        ]
+        if tokens:
+            session.execute(db.insert(token_model), tokens)
+
+
+SYNCED_ENTITIES = {Transaction: 'transaction', Category: 'category', Budget: 'budget'}
+
+
+@db.event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault('pending_changes', {})
+    changed = [(obj, 'upsert') for obj in session.new]
+    changed += [(obj, 'upsert') for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    changed += [(obj, 'delete') for obj in session.deleted]
+    for obj, op in changed:
+        entity = SYNCED_ENTITIES.get(type(obj))
+        if entity is not None:
+            pending[(obj.user_id, entity, obj.id)] = op
+
+
+@db.event.listens_for(Session, 'before_commit')
+def _write_change_log(session):
+    session.flush()
+    pending = session.info.pop('pending_changes', None)
+    bumped = session.info.pop('bumped_users', set())
+    if not pending:
+        return
+
+    now = datetime.utcnow()
+    for user_id in {key[0] for key in pending}:
+        if user_id not in bumped:
+            session.execute(
+                db.update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+            )
+        version = session.execute(db.select(User.data_version).where(User.id == user_id)).scalar()
+        session.execute(db.insert(ChangeLog), [
+            {'user_id': user_id, 'version': version, 'entity': entity, 'entity_id': entity_id,
+             'op': op, 'changed_at': now}
+            for (owner, entity, entity_id), op in pending.items() if owner == user_id
+        ])
+
+    # The note word index is derived from the same changes; MySQL uses its FULLTEXT index instead
+    if session.get_bind().dialect.name != 'mysql':
+        index_note_tokens(session, [entity_id for (_, entity, entity_id) in pending if entity == 'transaction'])
+
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('pending_changes', None)
+    session.info.pop('bumped_users', None)
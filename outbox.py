@@ -0,0 +1,194 @@
+"""Persistent outbound mail queue.
+
+Requests only add an OutboxMessage row, in the same transaction as the
+change that triggered it. A small pool of sender threads per process (or
+``flask send-mail`` from cron) claims due messages in batches, sends each
+batch over one SMTP connection and retries failures with exponential
+backoff until MAIL_MAX_ATTEMPTS is reached.
+"""
+import mimetypes
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy.orm import Session
+
+from models import db, OutboxMessage
+from workers import per_process
+
+_wakeup = threading.Event()
+
+
+def enqueue_mail(recipient, subject, body, attachment_path=None, attachment_name=None):
+    """Add a message to the outbox; it is sent once the caller commits."""
+    message = OutboxMessage(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        attachment_path=attachment_path,
+        attachment_name=attachment_name,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(message)
+    db.session.info['outbox_enqueued'] = True
+    return message
+
+
+@db.event.listens_for(Session, 'after_commit')
+def _wake_senders(session):
+    if session.info.pop('outbox_enqueued', False):
+        _wakeup.set()
+
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_wakeup(session):
+    session.info.pop('outbox_enqueued', None)
+
+
+def _claim(message, lease_until):
+    """Lease a due message unless another sender already has (compare-and-set, as in recurring._claim)."""
+    claimed = OutboxMessage.query.filter(
+        OutboxMessage.id == message.id,
+        OutboxMessage.status == message.status,
+        OutboxMessage.next_attempt_at == message.next_attempt_at
+    ).update(
+        {OutboxMessage.status: 'sending', OutboxMessage.next_attempt_at: lease_until},
+        synchronize_session=False
+    )
+    return claimed == 1
+
+
+def _claim_batch(now, batch_size, lease):
+    """Claim up to ``batch_size`` due messages: pending ones past their retry time and
+    sending ones whose lease expired (their sender died)."""
+    due = (
+        db.session.query(OutboxMessage.id, OutboxMessage.status, OutboxMessage.next_attempt_at)
+        .filter(OutboxMessage.status.in_(('pending', 'sending')), OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.next_attempt_at)
+        .limit(batch_size)
+        .all()
+    )
+    ids = [message.id for message in due if _claim(message, now + lease)]
+    db.session.commit()
+    if not ids:
+        return []
+    return OutboxMessage.query.filter(OutboxMessage.id.in_(ids)).order_by(OutboxMessage.id).all()
+
+
+def _build(message):
+    msg = Message(message.subject, recipients=[message.recipient], body=message.body)
+    if message.attachment_path:
+        name = message.attachment_name or os.path.basename(message.attachment_path)
+        with open(message.attachment_path, 'rb') as fh:
+            msg.attach(name, mimetypes.guess_type(name)[0] or 'application/octet-stream', fh.read())
+    return msg
+
+
+def _is_permanent(error):
+    """Errors that retrying cannot fix: 5xx replies and a missing attachment."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, FileNotFoundError):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def _record_failure(message, error, now, config):
+    message.attempts += 1
+    message.last_error = f"{type(error).__name__}: {error}"[:255]
+    if _is_permanent(error) or message.attempts >= config['MAIL_MAX_ATTEMPTS']:
+        message.status = 'failed'
+        current_app.logger.error("Giving up on outbox message %s to %s: %s", message.id, message.recipient, message.last_error)
+    else:
+        delay = min(config['MAIL_RETRY_BACKOFF'] * 2 ** (message.attempts - 1), config['MAIL_RETRY_MAX_BACKOFF'])
+        message.status = 'pending'
+        message.next_attempt_at = now + timedelta(seconds=delay)
+    db.session.commit()
+
+
+def send_due(now=None, batch_size=None):
+    """Send one batch of due messages over a single SMTP connection.
+
+    Each outcome is committed as soon as it is known, so a crash mid-batch
+    re-sends at most the message in flight once its lease expires.
+    Returns counts of the messages sent, rescheduled and given up on.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    claimed = _claim_batch(now, batch_size or config['MAIL_BATCH_SIZE'], timedelta(seconds=config['MAIL_SEND_LEASE']))
+    result = {'sent': 0, 'retried': 0, 'failed': 0}
+    if not claimed:
+        return result
+
+    remaining = list(claimed)
+    try:
+        with current_app.extensions['mail'].connect() as conn:
+            while remaining:
+                message = remaining.pop(0)
+                try:
+                    conn.send(_build(message))
+                except Exception as e:
+                    _record_failure(message, e, now, config)
+                else:
+                    message.status = 'sent'
+                    message.attempts += 1
+                    message.sent_at = datetime.utcnow()
+                    message.last_error = None
+                    db.session.commit()
+    except Exception as e:
+        # Connecting failed (or the connection dropped outside a send): retry the rest of the batch
+        db.session.rollback()
+        for message in remaining:
+            _record_failure(message, e, now, config)
+
+    for message in claimed:
+        result['sent' if message.status == 'sent' else 'failed' if message.status == 'failed' else 'retried'] += 1
+    return result
+
+
+def drain_outbox(batch_size=None):
+    """Send batches until nothing is due. Returns the summed send_due() counts."""
+    totals = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        result = send_due(batch_size=batch_size)
+        for key, count in result.items():
+            totals[key] += count
+        if not any(result.values()):
+            return totals
+
+
+def prune_outbox(days):
+    """Delete sent and failed messages older than ``days``. Returns the number removed."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = OutboxMessage.query.filter(
+        OutboxMessage.status.in_(('sent', 'failed')),
+        OutboxMessage.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@per_process
+def start_mail_senders(app):
+    """Start MAIL_SENDER_WORKERS daemon threads draining the outbox, once per process."""
+    for i in range(app.config['MAIL_SENDER_WORKERS']):
+        thread = threading.Thread(target=_run_sender, args=(app,), name=f"mail-sender-{i}", daemon=True)
+        thread.start()
+
+
+def _run_sender(app):
+    while True:
+        with app.app_context():
+            try:
+                result = send_due()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Mail outbox run failed")
+                result = {}
+        # A full batch means more may be waiting; otherwise sleep until a commit enqueues mail
+        if sum(result.values()) < app.config['MAIL_BATCH_SIZE']:
+            _wakeup.wait(app.config['MAIL_POLL_INTERVAL'])
+            _wakeup.clear()
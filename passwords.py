@@ -0,0 +1,75 @@
+"""Password hashing on a bounded worker pool.
+
+Hashing is deliberately slow, so running it inline lets a burst of logins
+take every CPU the web workers have. Here at most PASSWORD_HASH_WORKERS
+hashes run at once per process (hashlib releases the GIL, so they really
+run in parallel), at most PASSWORD_HASH_QUEUE more wait for a slot, and
+anything beyond that is turned away with HashingBusy instead of piling up.
+"""
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from workers import per_process
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool and its queue are full."""
+
+
+@per_process
+def _get_pool(app):
+    """The hashing pool and the semaphore bounding how many hashes it runs or queues."""
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return executor, threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+
+
+def _run(fn, *args):
+    app = current_app._get_current_object()
+    executor, slots = _get_pool(app)
+    if not slots.acquire(timeout=app.config['PASSWORD_HASH_TIMEOUT']):
+        raise HashingBusy()
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    """Hash with the configured PASSWORD_HASH_METHOD, e.g. ``pbkdf2:sha256:600000``."""
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+@functools.lru_cache(maxsize=None)
+def _method_prefix(method):
+    """The method part werkzeug stores for ``method``, with its default costs filled in.
+
+    ``scrypt`` is stored as ``scrypt:32768:8:1``, so the prefix is read off
+    one real hash (made once per process) rather than the config string.
+    """
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(stored_hash):
+    """True when a hash was made with a different method or cost than the configured one."""
+    return stored_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def check_password(user, password):
+    """Verify ``password`` for ``user``, upgrading the stored hash if its cost is outdated.
+
+    The caller commits; an upgrade that cannot get a hashing slot is
+    skipped and retried on the next login.
+    """
+    if not _run(check_password_hash, user.password, password):
+        return False
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(password)
+        except HashingBusy:
+            pass
+    return True
@@ -0,0 +1,185 @@
+"""Opt-in request instrumentation (PROFILING=True).
+
+For every request this records wall time, the SQL statements run with
+their count and total database time (through SQLAlchemy cursor events),
+and template render time. The numbers go out in a ``Server-Timing``
+header. Slow requests are logged with their query list, and a statement
+repeated PROFILING_N_PLUS_ONE times or more in one request is logged as
+a likely N+1 loop.
+
+Endpoints listed in PROFILING_SAMPLE_ENDPOINTS are also run under a
+sampling profiler. Their stacks are appended in the folded
+``frame;frame;frame count`` format read by flamegraph.pl and speedscope,
+one ``<endpoint>.folded`` file each under PROFILING_SAMPLE_DIR.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_profile = ContextVar('request_profile', default=None)
+_write_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (statement, seconds)
+        self.template_time = 0.0
+        self._template_started = []
+        self.sampler = None
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def statement_stats(self):
+        """(statement, count, seconds) per distinct statement, slowest first."""
+        counts = Counter()
+        totals = Counter()
+        for statement, seconds in self.queries:
+            counts[statement] += 1
+            totals[statement] += seconds
+        return sorted(((s, counts[s], totals[s]) for s in counts), key=lambda row: row[2], reverse=True)
+
+
+def current_profile():
+    """The RequestProfile of the request being handled, or None."""
+    return _profile.get()
+
+
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+def _write_stacks(directory, endpoint, stacks):
+    os.makedirs(directory, exist_ok=True)
+    with _write_lock, open(os.path.join(directory, f"{endpoint}.folded"), 'a') as fh:
+        for stack, count in stacks.items():
+            fh.write(f"{stack} {count}\n")
+
+
+def _one_line(statement, limit=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if profile is not None and conn.info.get('query_started'):
+        profile.queries.append((statement, time.perf_counter() - conn.info['query_started'].pop()))
+
+
+def init_profiling(app):
+    """Hook the instrumentation into ``app`` when PROFILING is on."""
+    if not app.config['PROFILING']:
+        return
+
+    sample_endpoints = {name.strip() for name in app.config['PROFILING_SAMPLE_ENDPOINTS'].split(',') if name.strip()}
+    sample_dir = app.config['PROFILING_SAMPLE_DIR'] or os.path.join(app.instance_path, 'profiles')
+
+    @before_render_template.connect_via(app)
+    def _template_started(sender, template, context, **extra):
+        profile = _profile.get()
+        if profile is not None:
+            profile._template_started.append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _template_finished(sender, template, context, **extra):
+        profile = _profile.get()
+        if profile is not None and profile._template_started:
+            profile.template_time += time.perf_counter() - profile._template_started.pop()
+
+    @app.before_request
+    def _start_profile():
+        profile = RequestProfile()
+        _profile.set(profile)
+        if request.endpoint in sample_endpoints:
+            profile.sampler = StackSampler(threading.get_ident(), app.config['PROFILING_SAMPLE_INTERVAL'] / 1000).start()
+
+    @app.after_request
+    def _report_profile(response):
+        profile = _profile.get()
+        if profile is None:
+            return response
+
+        elapsed = profile.elapsed()
+        response.headers['Server-Timing'] = (
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries", '
+            f'tpl;dur={profile.template_time * 1000:.1f}, '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+
+        stats = profile.statement_stats()
+        for statement, count, seconds in stats:
+            if count >= app.config['PROFILING_N_PLUS_ONE'] and statement.lstrip().upper().startswith('SELECT'):
+                app.logger.warning(
+                    "Possible N+1 on %s %s: %d x %s", request.method, request.path, count, _one_line(statement)
+                )
+
+        if elapsed * 1000 >= app.config['PROFILING_SLOW_MS']:
+            queries = '\n'.join(
+                f"  {count:4d} x {seconds * 1000:8.1f} ms  {_one_line(statement)}" for statement, count, seconds in stats[:20]
+            )
+            app.logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries in %.0f ms, templates %.0f ms\n%s",
+                request.method, request.full_path.rstrip('?'), elapsed * 1000,
+                profile.query_count, profile.db_time * 1000, profile.template_time * 1000, queries
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profile = _profile.get()
+        if profile is None:
+            return
+        _profile.set(None)
+        if profile.sampler is not None:
+            _write_stacks(sample_dir, request.endpoint, profile.sampler.stop())
@@ -0,0 +1,129 @@
+"""Token-bucket rate limiting for the authentication routes.
+
+Each key (a client IP or an account) owns a bucket of ``capacity`` tokens
+that refills continuously at ``capacity / period`` tokens per second; an
+attempt takes one token, and a check with ``cost=0`` only looks. Limits are written as ``"capacity/period"``, so
+``"10/300"`` allows a burst of 10 and then one attempt every 30 seconds.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+def parse_rate(rate):
+    """``"10/300"`` -> (capacity 10, refill 10/300 tokens per second)."""
+    capacity, period = (float(part) for part in rate.split('/'))
+    return capacity, capacity / period
+
+
+class NullLimiter:
+    """Backend that never limits (RATELIMIT_BACKEND=none)."""
+
+    def take(self, key, capacity, refill_rate, now=None, cost=1):
+        return 0.0
+
+
+class MemoryLimiter:
+    """In-process buckets. Each worker process counts on its own, so the
+    effective limit is multiplied by the number of workers."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, now=None, cost=1):
+        """Take ``cost`` tokens from ``key``'s bucket. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            # Least recently used buckets go first; a dropped bucket just starts full again
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class RedisLimiter:
+    """Buckets on a Redis-compatible server, shared by every worker and host."""
+
+    # Refill and take atomically; the wait is returned as a string to keep its fraction
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local capacity, rate, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - cost else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, prefix='quickledger:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATELIMIT_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, refill_rate, now=None, cost=1):
+        now = time.time() if now is None else now
+        return float(self._take(keys=[self.prefix + key], args=[capacity, refill_rate, now, cost]))
+
+
+def init_rate_limiter(app):
+    backend = app.config['RATELIMIT_BACKEND']
+    if backend == 'redis':
+        limiter = RedisLimiter(app.config['RATELIMIT_REDIS_URL'])
+    elif backend == 'memory':
+        limiter = MemoryLimiter(app.config['RATELIMIT_MEMORY_SIZE'])
+    elif backend == 'none':
+        limiter = NullLimiter()
+    else:
+        raise ValueError(f"Unknown RATELIMIT_BACKEND: {backend}")
+    app.extensions['rate_limiter'] = limiter
+    return limiter
+
+
+def _account_buckets(account):
+    """The account's bucket for the client IP and its bucket for all addresses, with their rates."""
+    account = account.lower()
+    return [
+        (f"account:{account}:ip:{request.remote_addr}", parse_rate(current_app.config['RATELIMIT_AUTH_ACCOUNT'])),
+        (f"account:{account}", parse_rate(current_app.config['RATELIMIT_AUTH_ACCOUNT_TOTAL'])),
+    ]
+
+
+def limit_auth_attempt(account=None):
+    """Charge one authentication attempt to the client IP and check, without charging, the account.
+
+    Returns 0 when the attempt may go ahead, otherwise the whole number of
+    seconds to wait. Accounts are only charged by charge_account(), for
+    failed logins. One address refills the account-wide bucket faster
+    than it may drain it, so it cannot lock the owner out on its own.
+    """
+    limiter = current_app.extensions['rate_limiter']
+    wait = limiter.take(f"ip:{request.remote_addr}", *parse_rate(current_app.config['RATELIMIT_AUTH_IP']))
+    if not wait and account:
+        wait = max(limiter.take(key, *rate, cost=0) for key, rate in _account_buckets(account))
+    return math.ceil(wait)
+
+
+def charge_account(account):
+    """Charge a failed login (or a reset request) to ``account``, from this client IP and overall."""
+    limiter = current_app.extensions['rate_limiter']
+    for key, rate in _account_buckets(account):
+        limiter.take(key, *rate)
@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime
+
+from models import db, User, Transaction, ChangeLog, DEFAULT_RECURRENCE, RECURRENCE_RULES, next_recurrence, transaction_hash
+from rollups import add_rows_to_rollup
+from workers import per_process
+
+
+def _claim(template, next_occurrence):
+    """Advance a template's watermark unless another runner already has.
+
+    The compare-and-set on the old value makes each occurrence
+    materialize exactly once even with several runners (cron plus the
+    in-process thread, or one thread per worker).
+    """
+    claimed = Transaction.query.filter(
+        Transaction.id == template.id,
+        Transaction.next_occurrence == template.next_occurrence
+    ).update({Transaction.next_occurrence: next_occurrence}, synchronize_session=False)
+    return claimed == 1
+
+
+def materialize_due(now=None, batch_size=500):
+    """Insert every recurring occurrence due up to ``now``, for all users.
+
+    Only templates whose next_occurrence watermark has passed are read,
+    through ix_transaction_next_occurrence, ``batch_size`` at a time. A
+    template that missed several periods (e.g. after downtime) gets all of
+    them in one go. Occurrences are bulk-inserted with their rollup,
+    change-log and data-version updates, and each batch commits on its own.
+
+    Returns a summary dict with the number of templates and occurrences.
+    """
+    now = now or datetime.utcnow()
+    result = {'templates': 0, 'created': 0}
+
+    while True:
+        templates = (
+            Transaction.query
+            .filter(Transaction.is_recurring.is_(True), Transaction.next_occurrence <= now)
+            .order_by(Transaction.next_occurrence, Transaction.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not templates:
+            break
+
+        rows = []
+        for template in templates:
+            rule = template.recurrence_type if template.recurrence_type in RECURRENCE_RULES else DEFAULT_RECURRENCE
+            occurrences = []
+            occurrence = template.next_occurrence
+            while occurrence <= now:
+                occurrences.append(occurrence)
+                occurrence = next_recurrence(template.timestamp, rule, occurrence)
+
+            if not _claim(template, occurrence):
+                continue
+            result['templates'] += 1
+            rows.extend(
+                {
+                    'user_id': template.user_id,
+                    'amount': template.amount,
+                    'category_id': template.category_id,
+                    'note': template.note,
+                    'timestamp': timestamp,
+                    'is_recurring': False,
+                    'recurring_source_id': template.id,
+                    'content_hash': transaction_hash(timestamp, template.amount, template.category_id, template.note),
+                }
+                for timestamp in occurrences
+            )
+
+        if rows:
+            db.session.execute(db.insert(Transaction), rows)
+            by_user = {}
+            for row in rows:
+                by_user.setdefault(row['user_id'], []).append(row)
+            for user_id, user_rows in by_user.items():
+                new_ids = db.session.query(Transaction.id).filter(
+                    Transaction.user_id == user_id,
+                    Transaction.recurring_source_id.in_({row['recurring_source_id'] for row in user_rows}),
+                    Transaction.timestamp.in_({row['timestamp'] for row in user_rows})
+                )
+                ChangeLog.record(user_id, 'transaction', [txn_id for (txn_id,) in new_ids])
+                add_rows_to_rollup(user_id, user_rows)
+                User.bump_data_version(user_id)
+        db.session.commit()
+        result['created'] += len(rows)
+
+    return result
+
+
+@per_process
+def start_scheduler(app):
+    """Run materialize_due() every RECURRING_INTERVAL seconds in a daemon thread, once per process."""
+    thread = threading.Thread(target=_run_scheduler, args=(app,), name='recurring-scheduler', daemon=True)
+    thread.start()
+
+
+def _run_scheduler(app):
+    while True:
+        with app.app_context():
+            try:
+                result = materialize_due()
+                if result['created']:
+                    app.logger.info("Materialized %s recurring transaction(s)", result['created'])
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Recurring transaction run failed")
+        time.sleep(app.config['RECURRING_INTERVAL'])
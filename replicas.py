@@ -0,0 +1,190 @@
+"""Read-replica routing.
+
+REPLICA_DATABASE_URIS lists read-only copies of the primary database;
+config.py registers them as the binds replica0, replica1... Inside
+``replica_reads()``, plain SELECTs go to one healthy replica, picked
+round robin and then kept for the rest of the session. Flushes, other
+statements and SELECT ... FOR UPDATE go to the primary, and once a
+session has written, its later reads go there too.
+
+Views decorated with ``@replica_route`` read from a replica on GET,
+except for a browser session that wrote something in the last
+REPLICA_STICKY_SECONDS, so people always see their own changes despite
+replication lag. Streamed bodies are wrapped in ``replica_stream()``.
+
+A replica that fails to connect or drops a connection is skipped for
+REPLICA_RETRY_INTERVAL seconds, and a replica is pinged before it is
+picked if it has not been checked for REPLICA_CHECK_INTERVAL seconds. A
+routed view that fails because its replica went down is run again on the
+primary, unless it already started streaming its response.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.sql import CompoundSelect, Select
+
+_down_until = {}  # bind key -> time.monotonic() until which it is skipped
+_checked_at = {}  # bind key -> time.monotonic() of its last successful ping
+_turn = itertools.count()
+_state_lock = threading.Lock()
+
+
+def _is_plain_select(clause):
+    if isinstance(clause, CompoundSelect):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends reads to a replica while ``read_replica`` is set in its info."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+
+        if self._flushing or (clause is not None and not _is_plain_select(clause)):
+            self.info['wrote'] = True
+        elif self.info.get('read_replica') and not self.info.get('wrote') and clause is not None:
+            name = self.info.get('replica')
+            if name is None or not _is_up(name):
+                name = _pick_replica(self._db)
+                self.info['replica'] = name
+            if name is not None:
+                return self._db.engines[name]
+        return engine
+
+
+def _db():
+    return current_app.extensions['sqlalchemy']
+
+
+def _is_up(name):
+    return _down_until.get(name, 0) <= time.monotonic()
+
+
+def _mark_down(app, name, error):
+    with _state_lock:
+        already_down = not _is_up(name)
+        _down_until[name] = time.monotonic() + app.config['REPLICA_RETRY_INTERVAL']
+        _checked_at.pop(name, None)
+    if not already_down:
+        app.logger.warning(
+            "Replica %s is unavailable, reading from the primary for %ss: %s",
+            name, app.config['REPLICA_RETRY_INTERVAL'], error
+        )
+
+
+def _ping(app, name, engine):
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('SELECT 1')
+    except SQLAlchemyError as e:
+        _mark_down(app, name, e)
+        return False
+    _checked_at[name] = time.monotonic()
+    return True
+
+
+def _pick_replica(db):
+    """Bind key of the next healthy replica, or None to use the primary."""
+    app = current_app._get_current_object()
+    names = app.extensions['replicas']
+    start = next(_turn)
+    for i in range(len(names)):
+        name = names[(start + i) % len(names)]
+        if not _is_up(name):
+            continue
+        if time.monotonic() - _checked_at.get(name, float('-inf')) > app.config['REPLICA_CHECK_INTERVAL']:
+            if not _ping(app, name, db.engines[name]):
+                continue
+        return name
+    return None
+
+
+@contextmanager
+def replica_reads():
+    """Send this app context's plain reads to a replica for the duration of the block."""
+    info = _db().session.info
+    previous = info.get('read_replica', False)
+    info['read_replica'] = True
+    try:
+        yield
+    finally:
+        info['read_replica'] = previous
+
+
+def _routable():
+    """Whether the current request may read from a replica."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and bool(current_app.extensions.get('replicas'))
+        and session.get('read_primary_until', 0) <= time.time()
+    )
+
+
+def replica_route(view):
+    """Serve GET requests of ``view`` from a replica, falling back to the primary."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _routable():
+            return view(*args, **kwargs)
+
+        try:
+            with replica_reads():
+                return view(*args, **kwargs)
+        except DBAPIError:
+            replica = _db().session.info.get('replica')
+            if replica is None or _is_up(replica):
+                raise
+            _db().session.rollback()
+            current_app.logger.warning("Retrying %s on the primary after replica %s failed", request.path, replica)
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def replica_stream(chunks):
+    """Stream ``chunks`` with replica reads for a routed request.
+
+    A streamed body is produced after the view's session has been torn
+    down, so the view's routing does not carry over to it.
+    """
+    if not _routable():
+        yield from chunks
+        return
+    with replica_reads():
+        yield from chunks
+
+
+def init_replicas(app):
+    """Watch the replica binds for failures and keep writers' reads on the primary."""
+    names = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key and key.startswith('replica'))
+    app.extensions['replicas'] = names
+    if not names:
+        return
+
+    db = app.extensions['sqlalchemy']
+    with app.app_context():
+        for name in names:
+            event.listen(db.engines[name], 'handle_error', _error_listener(app, name))
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if db.session.info.get('wrote'):
+            session['read_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+
+def _error_listener(app, name):
+    def on_error(context):
+        # No connection means connecting failed; is_disconnect means it was lost
+        if context.connection is None or context.is_disconnect:
+            _mark_down(app, name, context.original_exception)
+    return on_error
@@ -0,0 +1,166 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db, User, ReportJob, OutboxMessage
+from exports import render_pdf
+from outbox import enqueue_mail
+from metrics import record_export
+from replicas import replica_reads
+from workers import per_process
+
+# Queued/running jobs older than this are assumed lost (e.g. the worker was restarted)
+STALE_AFTER = timedelta(minutes=10)
+
+
+@per_process
+def _get_executor(app):
+    return ThreadPoolExecutor(max_workers=app.config['REPORT_WORKERS'], thread_name_prefix='report')
+
+
+def report_dir(app):
+    return app.config.get('REPORT_DIR') or os.path.join(app.instance_path, 'reports')
+
+
+def request_report(user_id, email_to=None):
+    """Return the PDF report job for the user's current data, enqueueing one if needed.
+
+    A finished report is reused until the user's data_version changes, and
+    a job already in flight for the same version is returned rather than
+    rendering twice. With ``email_to`` the PDF is also mailed there through
+    the outbox as soon as it is ready.
+    """
+    version = db.session.query(User.data_version).filter_by(id=user_id).scalar()
+    job = (
+        ReportJob.query.filter_by(user_id=user_id, data_version=version)
+        .filter(ReportJob.status != 'failed')
+        .order_by(ReportJob.created_at.desc())
+        .first()
+    )
+
+    if job and job.status in ('queued', 'running') and job.created_at > datetime.utcnow() - STALE_AFTER:
+        if not email_to or _attach_email(job, email_to):
+            return job
+        db.session.refresh(job)  # finished in the meantime
+    if job and job.status == 'done' and os.path.exists(job.path):
+        if email_to:
+            _enqueue_report_mail(job, email_to)
+            db.session.commit()
+        return job
+
+    job = ReportJob(id=uuid.uuid4().hex, user_id=user_id, data_version=version, status='queued', email_to=email_to)
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor(app).submit(_render_job, app, job.id)
+    return job
+
+
+def _render_job(app, job_id):
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        job.status = 'running'
+        db.session.commit()
+
+        directory = report_dir(app)
+        path = os.path.join(directory, f"{job.id}.pdf")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            started = time.perf_counter()
+            with open(path + '.tmp', 'wb') as fh:
+                _render(app, job.user_id, job.data_version, fh)
+            record_export('pdf', os.path.getsize(path + '.tmp'), time.perf_counter() - started)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception("Report job %s failed", job_id)
+            job.status = 'failed'
+            job.error = str(e)[:255]
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return
+
+        job.status = 'done'
+        job.path = path
+        job.finished_at = datetime.utcnow()
+        _purge_old_reports(job)
+        db.session.commit()
+
+        # Read after the commit so an address attached while rendering is not missed
+        if job.email_to:
+            _enqueue_report_mail(job, job.email_to)
+            db.session.commit()
+
+
+def _render(app, user_id, data_version, fileobj):
+    """Render from a replica once it has caught up with ``data_version``, otherwise from the primary."""
+    # A nested app context has its own session, which this job's writes have not pinned to the primary
+    with app.app_context():
+        if app.extensions.get('replicas'):
+            with replica_reads():
+                replica_version = db.session.query(User.data_version).filter_by(id=user_id).scalar()
+                if replica_version is not None and replica_version >= data_version:
+                    return render_pdf(user_id, fileobj)
+        render_pdf(user_id, fileobj)
+
+
+def _attach_email(job, email_to):
+    """Ask an in-flight job to mail its PDF when done. False if it already finished."""
+    attached = ReportJob.query.filter(
+        ReportJob.id == job.id,
+        ReportJob.status.in_(('queued', 'running'))
+    ).update({ReportJob.email_to: email_to}, synchronize_session=False)
+    db.session.commit()
+    return attached == 1
+
+
+def _enqueue_report_mail(job, email_to):
+    enqueue_mail(
+        email_to,
+        'QuickLedger - Your Financial Report',
+        'Hello,\n\nYour QuickLedger financial report is attached.\n\nBest regards,\nQuickLedger Team\n',
+        attachment_path=job.path,
+        attachment_name='QuickLedger_Report.pdf'
+    )
+
+
+def _purge_old_reports(current):
+    """Delete the user's superseded reports so only the latest stays on disk.
+
+    A report still attached to an unsent email is kept, job row included,
+    until a later purge finds the email sent or failed.
+    """
+    old_jobs = ReportJob.query.filter(
+        ReportJob.user_id == current.user_id,
+        ReportJob.id != current.id,
+        ReportJob.status.in_(('done', 'failed'))
+    ).all()
+    paths = [old.path for old in old_jobs if old.path]
+    attached = set(db.session.execute(
+        db.select(OutboxMessage.attachment_path).where(
+            OutboxMessage.status.in_(('pending', 'sending')),
+            OutboxMessage.attachment_path.in_(paths)
+        )
+    ).scalars()) if paths else set()
+    for old in old_jobs:
+        if old.path in attached:
+            continue
+        if old.path and os.path.exists(old.path):
+            os.remove(old.path)
+        db.session.delete(old)
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': f"/reports/{job.id}/download" if job.status == 'done' else None
+    }
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from sqlalchemy import extract, func, select, tuple_, union_all
+
+from models import db, Transaction, ArchivedTransaction, MonthlySummary
+
+
+def _bump(user_id, timestamp, category_id, amount, count):
+    """Add ``amount``/``count`` to a MonthlySummary bucket, creating it if needed.
+
+    Runs in the caller's session so it commits (or rolls back) together with
+    the Transaction change that triggered it.
+    """
+    bucket = MonthlySummary.query.filter_by(
+        user_id=user_id,
+        year=timestamp.year,
+        month=timestamp.month,
+        category_id=category_id
+    )
+
+    updated = bucket.update({
+        MonthlySummary.total: MonthlySummary.total + amount,
+        MonthlySummary.count: MonthlySummary.count + count
+    }, synchronize_session=False)
+
+    if not updated:
+        db.session.add(MonthlySummary(
+            user_id=user_id,
+            year=timestamp.year,
+            month=timestamp.month,
+            category_id=category_id,
+            total=amount,
+            count=count
+        ))
+        db.session.flush()
+    elif count < 0:
+        bucket.filter(MonthlySummary.count <= 0).delete(synchronize_session=False)
+
+
+def add_to_rollup(txn):
+    """Count a new (or newly edited) transaction in its monthly bucket."""
+    _bump(txn.user_id, txn.timestamp, txn.category_id, txn.amount, 1)
+
+
+def remove_from_rollup(txn):
+    """Take a deleted (or about to be edited) transaction out of its monthly bucket."""
+    _bump(txn.user_id, txn.timestamp, txn.category_id, -txn.amount, -1)
+
+
+def accumulate(buckets, timestamp, category_id, amount, count=1):
+    """Collect a rollup change in ``buckets`` so it can be applied with apply_buckets()."""
+    key = (timestamp.year, timestamp.month, category_id)
+    total, existing = buckets.get(key, (0, 0))
+    buckets[key] = (total + amount, existing + count)
+
+
+def apply_buckets(user_id, buckets):
+    """Apply accumulated changes, one bucket update per month and category."""
+    for (year, month, category_id), (total, count) in buckets.items():
+        if count or total:
+            _bump(user_id, datetime(year, month, 1), category_id, total, count)
+
+
+def add_rows_to_rollup(user_id, rows):
+    """Count bulk-inserted transaction dicts, one bucket update per month and category."""
+    buckets = {}
+    for row in rows:
+        accumulate(buckets, row['timestamp'], row['category_id'], row['amount'])
+    apply_buckets(user_id, buckets)
+
+
+def rebuild_rollups(user_id=None, start=None, end=None):
+    """Recompute MonthlySummary from Transaction and ArchivedTransaction for one user, or everyone.
+
+    ``start`` and ``end`` (first days of months) limit the rebuild to the
+    months in [start, end). Used to backfill the table, to repair drift
+    and to settle archived months; the caller commits.
+    """
+    stale = MonthlySummary.query
+    if user_id is not None:
+        stale = stale.filter_by(user_id=user_id)
+    if start is not None:
+        stale = stale.filter(tuple_(MonthlySummary.year, MonthlySummary.month) >= (start.year, start.month))
+    if end is not None:
+        stale = stale.filter(tuple_(MonthlySummary.year, MonthlySummary.month) < (end.year, end.month))
+    stale.delete(synchronize_session=False)
+
+    branches = []
+    for model in (Transaction, ArchivedTransaction):
+        branch = select(model.user_id, model.timestamp, model.category_id, model.amount)
+        if user_id is not None:
+            branch = branch.where(model.user_id == user_id)
+        if start is not None:
+            branch = branch.where(model.timestamp >= start)
+        if end is not None:
+            branch = branch.where(model.timestamp < end)
+        branches.append(branch)
+    rows = union_all(*branches).subquery()
+
+    source = select(
+        rows.c.user_id,
+        extract('year', rows.c.timestamp).label('year'),
+        extract('month', rows.c.timestamp).label('month'),
+        rows.c.category_id,
+        func.sum(rows.c.amount),
+        func.count()
+    ).group_by(rows.c.user_id, 'year', 'month', rows.c.category_id)
+    result = db.session.execute(
+        db.insert(MonthlySummary).from_select(
+            [MonthlySummary.user_id, MonthlySummary.year, MonthlySummary.month,
+             MonthlySummary.category_id, MonthlySummary.total, MonthlySummary.count],
+            source
+        )
+    )
+    return result.rowcount
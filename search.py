@@ -0,0 +1,175 @@
+"""Indexed search over transaction notes.
+
+On MySQL notes are matched through the ``ft_transaction_note`` FULLTEXT
+index in boolean mode. Other databases (SQLite in development and tests)
+use the NoteToken word table, which is kept in step with every
+transaction change at commit time. Both backends AND the search words
+together and treat each one as a prefix, so ``gro`` finds "groceries".
+
+Archived transactions (see archive.py) are always searched through the
+ArchivedNoteToken word table, written when they are archived.
+"""
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import joinedload
+
+from models import (
+    db, Transaction, ArchivedTransaction, NoteToken, ArchivedNoteToken, index_note_tokens, note_tokens
+)
+
+# Sorts after any character a token can contain, closing a prefix range
+_PREFIX_END = '\U0010ffff'
+
+# A search word starting at most this many of a user's note words is rare enough that
+# a page of newest matches is found fastest by sorting all of them; for a commoner
+# word it is faster to walk the user's newest transactions and check each one
+RARE_MATCHES = 5000
+
+
+def uses_fulltext():
+    return db.engine.dialect.name == 'mysql'
+
+
+def _terms(search):
+    return sorted(note_tokens(search))
+
+
+def _boolean_query(terms):
+    return ' '.join(f"+{term}*" for term in terms)
+
+
+def _fulltext_match(terms):
+    """MATCH ... AGAINST expression, usable both as the filter and as the relevance score."""
+    return match(Transaction.note, against=_boolean_query(terms)).in_boolean_mode()
+
+
+def _prefix(token_model, term):
+    return db.and_(token_model.token >= term, token_model.token < term + _PREFIX_END)
+
+
+def _token_ids(user_id, term, token_model):
+    """Ids of a user's notes with a word starting with ``term``, an index range on the primary key."""
+    return select(token_model.transaction_id).where(token_model.user_id == user_id, _prefix(token_model, term))
+
+
+def _any_rare(user_id, terms, token_model):
+    """True when some search word starts at most RARE_MATCHES note words; counting stops there."""
+    for term in terms:
+        counted = select(func.count()).select_from(_token_ids(user_id, term, token_model).limit(RARE_MATCHES + 1).subquery())
+        if db.session.execute(counted).scalar() <= RARE_MATCHES:
+            return True
+    return False
+
+
+def _token_matches(user_id, term, token_model=NoteToken):
+    """Subquery of (transaction_id, weight) for notes with a word starting with ``term``.
+
+    An exact word match weighs 2 and a longer word 1; the range on the
+    (user_id, token) primary key keeps this an index seek.
+    """
+    return (
+        select(
+            token_model.transaction_id,
+            func.max(case((token_model.token == term, 2), else_=1)).label('weight')
+        )
+        .where(token_model.user_id == user_id, _prefix(token_model, term))
+        .group_by(token_model.transaction_id)
+    )
+
+
+def note_filter(user_id, search, model=Transaction, paged=False):
+    """WHERE criterion matching a user's transactions whose note contains every search word.
+
+    The criterion includes the user_id condition, written so the database
+    starts from whichever side is cheaper. Pass ``paged=True`` for a query
+    read newest first under a LIMIT: unless a search word is rare, it then
+    walks the (user_id, timestamp) index and checks each row's own tokens,
+    so a page of common matches is found without collecting every one.
+    Otherwise the query starts from the matching token rows.
+
+    ``model`` is Transaction or ArchivedTransaction. Returns None when the
+    search has no words to look for.
+    """
+    terms = _terms(search)
+    if not terms:
+        return None
+    if model is Transaction and uses_fulltext():
+        return db.and_(model.user_id == user_id, _fulltext_match(terms))
+    token_model = ArchivedNoteToken if model is ArchivedTransaction else NoteToken
+    if paged and not _any_rare(user_id, terms, token_model):
+        return db.and_(model.user_id == user_id, *(
+            db.exists().where(token_model.transaction_id == model.id, _prefix(token_model, term))
+            for term in terms
+        ))
+    # The token rows are already the user's; "+ 0" keeps the user_id check off the
+    # (user_id, timestamp) index, which would otherwise be walked for the ORDER BY
+    return db.and_(model.user_id + 0 == user_id, *(
+        model.id.in_(_token_ids(user_id, term, token_model)) for term in terms
+    ))
+
+
+def _search(model, user_id, terms, start_date, end_date, limit):
+    query = (
+        db.session.query(model)
+        .options(joinedload(model.category))
+        .filter(model.user_id == user_id)
+    )
+    if model is Transaction and uses_fulltext():
+        score = _fulltext_match(terms)
+        query = query.add_columns(score.label('score')).filter(score)
+    else:
+        token_model = ArchivedNoteToken if model is ArchivedTransaction else NoteToken
+        subqueries = [_token_matches(user_id, term, token_model).subquery() for term in terms]
+        for sq in subqueries:
+            query = query.join(sq, sq.c.transaction_id == model.id)
+        score = sum((sq.c.weight for sq in subqueries[1:]), subqueries[0].c.weight)
+        query = query.add_columns(score.label('score'))
+
+    if start_date:
+        query = query.filter(model.timestamp >= start_date)
+    if end_date:
+        query = query.filter(model.timestamp <= end_date)
+
+    rows = query.order_by(db.desc('score'), model.timestamp.desc(), model.id.desc()).limit(limit).all()
+    return [(txn, float(score)) for txn, score in rows]
+
+
+def search_transactions(user_id, search, start_date=None, end_date=None, limit=50):
+    """A user's transactions matching ``search``, best match first, then newest.
+
+    Archived matches come after all live ones, and the archive is only
+    searched when the live table has fewer than ``limit`` matches.
+    Returns a list of (transaction, score) pairs.
+    """
+    terms = _terms(search)
+    if not terms:
+        return []
+
+    results = _search(Transaction, user_id, terms, start_date, end_date, limit)
+    if len(results) < limit:
+        results += _search(ArchivedTransaction, user_id, terms, start_date, end_date, limit - len(results))
+    return results
+
+
+def reindex_notes(user_id=None, batch_size=1000):
+    """Rebuild NoteToken and ArchivedNoteToken rows (all users, or one) in id batches.
+
+    NoteToken is not used, and so not rebuilt, on MySQL.
+    """
+    indexed = 0
+    for model, token_model in ((Transaction, NoteToken), (ArchivedTransaction, ArchivedNoteToken)):
+        if model is Transaction and uses_fulltext():
+            continue
+        last_id = 0
+        while True:
+            query = select(model.id).where(model.id > last_id).order_by(model.id).limit(batch_size)
+            if user_id is not None:
+                query = query.where(model.user_id == user_id)
+            ids = db.session.execute(query).scalars().all()
+            if not ids:
+                break
+            index_note_tokens(db.session, ids, model=model, token_model=token_model)
+            db.session.commit()
+            indexed += len(ids)
+            last_id = ids[-1]
+    return indexed
@@ -0,0 +1,124 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload
+
+from models import db, User, Transaction, ArchivedTransaction, Category, Budget, ChangeLog
+
+ENTITY_MODELS = {'transaction': Transaction, 'category': Category, 'budget': Budget}
+# Where rows that left the live table still exist; archival writes no change log entries
+ARCHIVE_MODELS = {'transaction': ArchivedTransaction}
+
+
+def encode_sync_cursor(version, change_id):
+    return base64.urlsafe_b64encode(f"{version}|{change_id}".encode()).decode()
+
+
+def decode_sync_cursor(cursor):
+    """Return (version, change_id); raises ValueError for a malformed cursor."""
+    try:
+        version, change_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return int(version), int(change_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def current_cursor(user_id):
+    """Cursor pointing just past the user's latest committed change."""
+    version = db.session.query(User.data_version).filter_by(id=user_id).scalar() or 0
+    last_id = db.session.query(func.max(ChangeLog.id)).filter(
+        ChangeLog.user_id == user_id, ChangeLog.version == version
+    ).scalar()
+    return encode_sync_cursor(version, last_id or 0)
+
+
+def snapshot(user_id):
+    """Full state for a client starting from scratch (or whose cursor has been pruned).
+
+    Transactions are not included; clients page through /api/transactions
+    after taking the cursor, and anything that changes meanwhile is replayed
+    by the next sync.
+    """
+    cursor = current_cursor(user_id)
+    return {
+        'full': True,
+        'cursor': cursor,
+        'has_more': False,
+        'upserts': {
+            'category': Category.query.filter_by(user_id=user_id).order_by(Category.id).all(),
+            'budget': Budget.query.filter_by(user_id=user_id).order_by(Budget.id).all(),
+            'transaction': [],
+        },
+        'deleted': {entity: [] for entity in ENTITY_MODELS},
+    }
+
+
+def changes_since(user_id, cursor, limit=500):
+    """Return what changed after ``cursor``, at most ``limit`` change-log rows at a time.
+
+    Several changes to one row collapse into its current state, or into a
+    tombstone id if it no longer exists. A row that was archived is still
+    current: it comes back from the archive as an upsert. Falls back to a snapshot when the
+    cursor is older than the retained change log.
+    """
+    version, change_id = decode_sync_cursor(cursor)
+
+    # Everything after ``floor`` is still in the log; an older cursor may have missed pruned rows
+    oldest = db.session.query(func.min(ChangeLog.version)).filter(ChangeLog.user_id == user_id).scalar()
+    if oldest is not None:
+        floor = oldest - 1
+    else:
+        floor = db.session.query(User.data_version).filter_by(id=user_id).scalar() or 0
+    if version < floor:
+        return snapshot(user_id)
+
+    rows = (
+        ChangeLog.query
+        .filter(
+            ChangeLog.user_id == user_id,
+            or_(ChangeLog.version > version, and_(ChangeLog.version == version, ChangeLog.id > change_id))
+        )
+        .order_by(ChangeLog.version, ChangeLog.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    touched = {entity: set() for entity in ENTITY_MODELS}
+    for row in rows:
+        touched[row.entity].add(row.entity_id)
+
+    upserts = {}
+    deleted = {}
+    for entity, model in ENTITY_MODELS.items():
+        ids = touched[entity]
+        current = []
+        for source in (model, ARCHIVE_MODELS.get(entity)):
+            missing = ids - {obj.id for obj in current}
+            if not missing or source is None:
+                continue
+            query = source.query.filter(source.user_id == user_id, source.id.in_(missing))
+            if entity == 'transaction':
+                query = query.options(joinedload(source.category))
+            current += query.all()
+        current.sort(key=lambda obj: obj.id)
+        upserts[entity] = current
+        deleted[entity] = sorted(ids - {obj.id for obj in current})
+
+    return {
+        'full': False,
+        'cursor': encode_sync_cursor(rows[-1].version, rows[-1].id) if rows else cursor,
+        'has_more': has_more,
+        'upserts': upserts,
+        'deleted': deleted,
+    }
+
+
+def prune_change_log(days):
+    """Delete change-log rows older than ``days``; clients behind that get a snapshot."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = ChangeLog.query.filter(ChangeLog.changed_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,9 @@
+"""Route blueprints. URLs are unchanged; endpoint names are ``<blueprint>.<view>``."""
+from views import api, auth, budgets, categories, exports, transactions
+
+BLUEPRINTS = [auth.bp, transactions.bp, budgets.bp, categories.bp, exports.bp, api.bp]
+
+
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
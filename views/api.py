@@ -0,0 +1,255 @@
+"""JSON API used by the dashboard scripts and sync clients."""
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request, session
+
+from models import db, ReportJob
+from aggregates import ledger_queries, category_totals, monthly_totals, dashboard_summary
+from batch import BatchError, apply_batch
+from sync import changes_since, snapshot
+from cache import cached_json
+from search import search_transactions
+from reports import request_report, serialize_job
+from replicas import replica_route
+from views.common import (
+    paginate_transactions, serialize_transaction, serialize_category, serialize_budget, serialize_budget_status
+)
+
+bp = Blueprint('api', __name__)
+
+
+# =====================
+# API Endpoints
+# =====================
+@bp.route('/api/transactions')
+def api_transactions():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    queries = ledger_queries(
+        session['user_id'],
+        request.args.get('start_date'),
+        request.args.get('end_date'),
+        request.args.get('note')
+    )
+
+    per_page = request.args.get('per_page', type=int)
+    if per_page is not None:
+        per_page = max(1, min(per_page, 200))
+
+    try:
+        transactions, next_cursor = paginate_transactions(queries, request.args.get('cursor'), per_page)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'transactions': [serialize_transaction(t) for t in transactions],
+        'next_cursor': next_cursor
+    })
+
+
+@bp.route('/api/transactions/batch', methods=['POST'])
+def api_transactions_batch():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    operations = payload.get('operations')
+    limit = current_app.config['BATCH_MAX_OPERATIONS']
+    if isinstance(operations, list) and len(operations) > limit:
+        return jsonify({'error': f'At most {limit} operations per batch'}), 413
+
+    try:
+        results, applied = apply_batch(session['user_id'], operations, atomic=bool(payload.get('atomic')))
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Batch for user %s failed", session['user_id'])
+        return jsonify({'error': 'Batch failed, nothing was applied'}), 500
+
+    failed = sum(1 for r in results if r['status'] == 'error')
+    return jsonify({
+        'applied': applied,
+        'succeeded': sum(1 for r in results if r['status'] == 'ok') if applied else 0,
+        'failed': failed,
+        'results': results
+    }), 422 if failed and not applied and payload.get('atomic') else 200
+
+
+@bp.route('/api/search')
+def api_search():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    results = search_transactions(
+        session['user_id'],
+        request.args.get('q', ''),
+        request.args.get('start_date'),
+        request.args.get('end_date'),
+        limit
+    )
+    return jsonify({
+        'results': [dict(serialize_transaction(txn), score=score) for txn, score in results]
+    })
+
+
+@bp.route('/api/sync')
+def api_sync():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    limit = max(1, min(request.args.get('limit', current_app.config['SYNC_PAGE_SIZE'], type=int), 1000))
+    since = request.args.get('since')
+    try:
+        changes = changes_since(session['user_id'], since, limit) if since else snapshot(session['user_id'])
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    upserts = changes['upserts']
+    return jsonify({
+        'full': changes['full'],
+        'cursor': changes['cursor'],
+        'has_more': changes['has_more'],
+        'transactions': [serialize_transaction(t) for t in upserts['transaction']],
+        'categories': [serialize_category(c) for c in upserts['category']],
+        'budgets': [serialize_budget(b) for b in upserts['budget']],
+        'deleted': changes['deleted']
+    })
+
+
+@bp.route('/api/dashboard-summary')
+@replica_route
+def api_dashboard_summary():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    def build():
+        summary = dashboard_summary(
+            session['user_id'],
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('note')
+        )
+        return {
+            'totals': {'income': summary['income'], 'expense': summary['expense'], 'balance': summary['balance']},
+            'breakdown': summary['breakdown'],
+            'trend': summary['trend'],
+            'monthly': summary['monthly'],
+            'insights': summary['insights'],
+            'budgets': [serialize_budget_status(b) for b in summary['budgets']]
+        }
+
+    # The budgets section is this month's, so a new month needs a new entry even without writes
+    return cached_json('dashboard-summary', session['user_id'], build, period=f"{datetime.now():%Y-%m}")
+
+
+@bp.route('/api/insights')
+@replica_route
+def api_insights():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    today = datetime.now()
+
+    def build():
+        from analytics import analytics_summary
+        return analytics_summary(session['user_id'], today)
+
+    return cached_json('insights', session['user_id'], build, period=f"{today:%Y-%m-%d}")
+
+
+@bp.route('/api/expense-breakdown')
+@replica_route
+def api_expense_breakdown():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    def build():
+        # Expense breakdown by category (only expense categories)
+        expense_data = [
+            c for c in category_totals(
+                session['user_id'],
+                request.args.get('start_date'),
+                request.args.get('end_date'),
+                request.args.get('note')
+            )
+            if c['type'] == 'Expense'
+        ]
+
+        labels = []
+        data = []
+        colors = []
+
+        for category in expense_data:
+            labels.append(category['name'])
+            data.append(category['total'])
+            colors.append(category['color'] or '#6c757d')
+
+        return {
+            'labels': labels,
+            'data': data,
+            'colors': colors
+        }
+
+    return cached_json('expense-breakdown', session['user_id'], build)
+
+
+@bp.route('/api/income-expense-trend')
+@replica_route
+def api_income_expense_trend():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    def build():
+        # Get last 12 months data
+        monthly_data = monthly_totals(
+            session['user_id'],
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('note'),
+            limit=12
+        )
+
+        labels = []
+        income_data = []
+        expense_data = []
+
+        for row in monthly_data:
+            month_name = datetime(row['year'], row['month'], 1).strftime('%b %Y')
+            labels.append(month_name)
+            income_data.append(row['income'])
+            expense_data.append(row['expense'])
+
+        return {
+            'labels': labels,
+            'income': income_data,
+            'expense': expense_data
+        }
+
+    return cached_json('income-expense-trend', session['user_id'], build)
+
+
+@bp.route('/api/reports/pdf', methods=['POST'])
+def api_request_report():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    job = request_report(session['user_id'], email_to=session['email'] if data.get('email') else None)
+    return jsonify(serialize_job(job)), 200 if job.status == 'done' else 202
+
+
+@bp.route('/api/reports/<job_id>')
+def api_report_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    job = ReportJob.query.filter_by(id=job_id, user_id=session['user_id']).first()
+    if not job:
+        return jsonify({'error': 'Report not found'}), 404
+    return jsonify(serialize_job(job))
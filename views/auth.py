@@ -0,0 +1,234 @@
+"""Registration, login, password reset and logout."""
+import re
+import secrets
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+
+from models import db, User, Category
+from outbox import enqueue_mail
+from passwords import HashingBusy, hash_password, check_password
+from ratelimit import charge_account, limit_auth_attempt
+
+bp = Blueprint('auth', __name__)
+
+
+# =====================
+# Helpers
+# =====================
+def too_many_attempts(template, wait):
+    """429 page for an auth form whose rate limit is exhausted."""
+    flash(f'Too many attempts. Please try again in {wait} seconds.', 'danger')
+    return render_template(template), 429, {'Retry-After': str(wait)}
+
+
+def hashing_busy(template):
+    """503 page for an auth form when the password hashing pool is saturated."""
+    flash('The server is busy right now. Please try again in a moment.', 'warning')
+    return render_template(template), 503, {'Retry-After': '5'}
+
+
+# =====================
+# Register / Login
+# =====================
+@bp.route('/')
+def home():
+    if "user_id" in session:
+        return redirect(url_for('transactions.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '')
+
+        wait = limit_auth_attempt()
+        if wait:
+            return too_many_attempts('register.html', wait)
+
+        # Validation
+        if not email or not password:
+            flash('Email and password are required.', 'danger')
+            return render_template('register.html')
+
+        existing_user = User.query.filter_by(email=email).first()
+        if existing_user:
+            flash('User already exists! Try logging in.', 'warning')
+            return render_template('register.html')
+
+        if len(password) < 6:
+            flash('Password must be at least 6 characters long.', 'danger')
+            return render_template('register.html')
+        if not re.search(r"\d", password):
+            flash('Password must contain at least one number.', 'danger')
+            return render_template('register.html')
+        if not re.search(r"[A-Za-z]", password):
+            flash('Password must contain at least one letter.', 'danger')
+            return render_template('register.html')
+
+        try:
+            hashed_password = hash_password(password)
+        except HashingBusy:
+            return hashing_busy('register.html')
+
+        try:
+            new_user = User(email=email, password=hashed_password)
+            db.session.add(new_user)
+            db.session.commit()
+            
+            # Initialize default categories for new user
+            default_categories = [
+                ('Salary', 'Income', '#28a745'),
+                ('Freelance', 'Income', '#20c997'),
+                ('Food', 'Expense', '#dc3545'),
+                ('Transport', 'Expense', '#fd7e14'),
+                ('Shopping', 'Expense', '#e83e8c'),
+                ('Bills', 'Expense', '#6610f2'),
+                ('Entertainment', 'Expense', '#17a2b8'),
+                ('Healthcare', 'Expense', '#ffc107'),
+                ('Other', 'Expense', '#6c757d')
+            ]
+            
+            for cat_name, cat_type, color in default_categories:
+                category = Category(name=cat_name, type=cat_type, color=color, user_id=new_user.id)
+                db.session.add(category)
+            
+            db.session.commit()
+            flash('Registration successful! Please log in.', 'success')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            db.session.rollback()
+            flash('An error occurred during registration. Please try again.', 'danger')
+            return render_template('register.html')
+
+    return render_template('register.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '')
+
+        if not email or not password:
+            flash('Email and password are required.', 'danger')
+            return render_template('login.html')
+
+        wait = limit_auth_attempt(email)
+        if wait:
+            return too_many_attempts('login.html', wait)
+
+        user = User.query.filter_by(email=email).first()
+        try:
+            valid = user is not None and check_password(user, password)
+        except HashingBusy:
+            return hashing_busy('login.html')
+
+        if valid:
+            db.session.commit()  # saves a rehashed password
+            session.permanent = True
+            session['user_id'] = user.id
+            session['email'] = user.email
+            flash(f'Welcome back, {email}!', 'success')
+            return redirect(url_for('transactions.dashboard'))
+        else:
+            charge_account(email)
+            flash('Invalid credentials! Please try again.', 'danger')
+            return render_template('login.html')
+
+    return render_template('login.html')
+
+
+# =====================
+# Forgot / Reset Password
+# =====================
+@bp.route("/forgot-password", methods=["GET", "POST"])
+def forgot_password():
+    if request.method == "POST":
+        email = request.form.get("email", "").strip()
+        
+        if not email:
+            flash("Email is required.", "danger")
+            return render_template("forgot_password.html")
+
+        wait = limit_auth_attempt(email)
+        if wait:
+            return too_many_attempts("forgot_password.html", wait)
+        charge_account(email)  # every request sends mail, not only failed ones
+        
+        user = User.query.filter_by(email=email).first()
+
+        if user:
+            token = secrets.token_urlsafe(32)
+            user.reset_token = token
+            user.token_expiry = datetime.utcnow() + timedelta(hours=1)
+            reset_link = url_for("auth.reset_password", token=token, _external=True)
+
+            # Only queued here; the outbox senders deliver and retry it
+            if current_app.config['MAIL_USERNAME']:
+                enqueue_mail(email, 'QuickLedger - Password Reset Request', f'''Hello,
+
+You requested a password reset for your QuickLedger account.
+
+Click the link below to reset your password:
+{reset_link}
+
+This link will expire in 1 hour.
+
+If you didn't request this, please ignore this email.
+
+Best regards,
+QuickLedger Team
+''')
+                db.session.commit()
+                flash("Password reset link has been sent to your email.", "success")
+            else:
+                db.session.commit()
+                print("🔗 Password reset link:", reset_link)
+                flash("Password reset link has been generated (check console in dev mode).", "info")
+        else:
+            # Don't reveal if email exists for security
+            flash("If an account exists with that email, a reset link has been sent.", "info")
+
+    return render_template("forgot_password.html")
+
+
+@bp.route("/reset-password/<token>", methods=["GET", "POST"])
+def reset_password(token):
+    # Charged before the token lookup so reset tokens cannot be guessed at speed
+    if request.method == "POST":
+        wait = limit_auth_attempt()
+        if wait:
+            return too_many_attempts("reset_password.html", wait)
+
+    user = User.query.filter_by(reset_token=token).first()
+
+    if not user or user.token_expiry < datetime.utcnow():
+        flash("Invalid or expired reset link.", "danger")
+        return redirect(url_for("auth.forgot_password"))
+
+    if request.method == "POST":
+        try:
+            new_password = hash_password(request.form["password"])
+        except HashingBusy:
+            return hashing_busy("reset_password.html")
+        user.password = new_password
+        user.reset_token = None
+        user.token_expiry = None
+        db.session.commit()
+
+        flash("Password reset successful! Please log in.", "success")
+        return redirect(url_for("auth.login"))
+
+    return render_template("reset_password.html")
+
+
+# =====================
+# Logout
+# =====================
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,73 @@
+"""Monthly budgets."""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from models import db, User, Category, Budget, validate_amount
+from aggregates import budget_progress
+
+bp = Blueprint('budgets', __name__)
+
+
+# =====================
+# Budget Management
+# =====================
+@bp.route('/budgets', methods=['GET', 'POST'])
+def budgets():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if request.method == 'POST':
+        try:
+            category = Category.query.filter_by(
+                id=request.form.get('category_id', type=int),
+                user_id=session['user_id']
+            ).one()
+            amount = validate_amount(request.form.get('amount', 0))
+            month = int(request.form.get('month', datetime.now().month))
+            year = int(request.form.get('year', datetime.now().year))
+            
+            # Check if budget already exists
+            existing_budget = Budget.query.filter_by(
+                user_id=session['user_id'],
+                category_id=category.id,
+                month=month,
+                year=year
+            ).first()
+            
+            if existing_budget:
+                existing_budget.amount = amount
+                flash('Budget updated successfully!', 'success')
+            else:
+                new_budget = Budget(
+                    category_id=category.id,
+                    amount=amount,
+                    month=month,
+                    year=year,
+                    user_id=session['user_id']
+                )
+                db.session.add(new_budget)
+                flash('Budget created successfully!', 'success')
+            
+            User.bump_data_version(session['user_id'])
+            db.session.commit()
+        except ValueError:
+            db.session.rollback()
+            flash('Invalid budget amount or period.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash('Error managing budget.', 'danger')
+    
+    # Get current month budgets
+    current_month = datetime.now().month
+    current_year = datetime.now().year
+    
+    budget_items = budget_progress(session['user_id'], current_year, current_month)
+    
+    user_categories = Category.query.filter_by(user_id=session['user_id'], type='Expense').all()
+    
+    return render_template('budgets.html', 
+                         budget_progress=budget_items,
+                         user_categories=user_categories,
+                         current_month=current_month,
+                         current_year=current_year)
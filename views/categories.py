@@ -0,0 +1,78 @@
+"""Category management."""
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from models import db, User, Transaction, ArchivedTransaction, Category, Budget
+
+bp = Blueprint('categories', __name__)
+
+
+# =====================
+# Category Management
+# =====================
+@bp.route('/categories', methods=['GET', 'POST'])
+def categories():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if request.method == 'POST':
+        try:
+            name = request.form.get('name', '').strip()
+            cat_type = request.form.get('type', 'Expense')
+            color = request.form.get('color', '#6c757d')
+            
+            if not name:
+                flash('Category name is required.', 'danger')
+                return redirect(url_for('categories.categories'))
+            
+            # Check if category already exists
+            existing = Category.query.filter_by(
+                user_id=session['user_id'],
+                name=name
+            ).first()
+            
+            if existing:
+                flash('Category already exists!', 'warning')
+            else:
+                new_category = Category(
+                    name=name,
+                    type=cat_type,
+                    color=color,
+                    user_id=session['user_id']
+                )
+                db.session.add(new_category)
+                User.bump_data_version(session['user_id'])
+                db.session.commit()
+                flash('Category created successfully!', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash('Error creating category.', 'danger')
+    
+    user_categories = Category.query.filter_by(user_id=session['user_id']).order_by(Category.type, Category.name).all()
+    return render_template('categories.html', categories=user_categories)
+
+
+@bp.route('/categories/delete/<int:category_id>', methods=['POST'])
+def delete_category(category_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    category = Category.query.filter_by(id=category_id, user_id=session['user_id']).first()
+    
+    if category:
+        # Check if category is used in transactions, archived ones included
+        transaction_count = sum(
+            model.query.filter_by(user_id=session['user_id'], category_id=category.id).count()
+            for model in (Transaction, ArchivedTransaction)
+        )
+        
+        if transaction_count > 0:
+            flash(f'Cannot delete category "{category.name}" as it is used in {transaction_count} transaction(s).', 'danger')
+        else:
+            for budget in Budget.query.filter_by(category_id=category.id):
+                db.session.delete(budget)
+            db.session.delete(category)
+            User.bump_data_version(session['user_id'])
+            db.session.commit()
+            flash('Category deleted successfully!', 'success')
+    
+    return redirect(url_for('categories.categories'))
@@ -0,0 +1,133 @@
+"""Pagination and JSON serializers shared by the HTML views and the API."""
+import base64
+import heapq
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from cache import cache_key, cached_body
+
+
+class MoneyJSONProvider(DefaultJSONProvider):
+    """Serializes Decimal amounts as JSON numbers rather than Flask's default strings.
+
+    Amounts have two decimal places, so the float's shortest repr is the
+    exact amount.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+
+def encode_cursor(txn):
+    """Encode a transaction's (timestamp, id) position as an opaque page cursor."""
+    raw = f"{txn.timestamp.isoformat()}|{txn.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a page cursor back to (timestamp, id). Raises ValueError if malformed."""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, txn_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(timestamp), int(txn_id)
+
+
+def _page(query, position, limit):
+    """Up to ``limit`` rows of a Transaction or ArchivedTransaction query after ``position``, newest first."""
+    model = query.column_descriptions[0]['entity']
+    if position:
+        timestamp, txn_id = position
+        query = query.filter(or_(
+            model.timestamp < timestamp,
+            and_(model.timestamp == timestamp, model.id < txn_id)
+        ))
+    return (
+        query.options(joinedload(model.category))
+        .order_by(model.timestamp.desc(), model.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def paginate_transactions(queries, cursor=None, per_page=None):
+    """Keyset-paginate transaction queries on (timestamp, id), newest first.
+
+    ``queries`` are typically the live and archived queries from
+    aggregates.ledger_queries(). Each is paged on its own index and the
+    pages are merged, so one cursor runs through both tables in a single
+    order (ids are never reused across them). Returns (transactions,
+    next_cursor); next_cursor is None on the last page.
+    """
+    per_page = per_page or current_app.config['TRANSACTIONS_PER_PAGE']
+    position = decode_cursor(cursor) if cursor else None
+
+    pages = [_page(query, position, per_page + 1) for query in queries]
+    rows = list(heapq.merge(*pages, key=lambda txn: (txn.timestamp, txn.id), reverse=True))[:per_page + 1]
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def serialize_transaction(txn):
+    """JSON-ready dict for a transaction row."""
+    return {
+        'id': txn.id,
+        'amount': txn.amount,
+        'category_id': txn.category_id,
+        'category': txn.category.name,
+        'color': txn.category.color or '#6c757d',
+        'note': txn.note,
+        'timestamp': txn.timestamp.strftime("%Y-%m-%d %H:%M"),
+        'is_recurring': bool(txn.is_recurring),
+        'is_archived': txn.is_archived
+    }
+
+
+def serialize_category(category):
+    return {'id': category.id, 'name': category.name, 'type': category.type, 'color': category.color or '#6c757d'}
+
+
+def serialize_budget_status(item):
+    """JSON-ready dict for one budget_progress() row."""
+    return {
+        'budget_id': item['budget'].id,
+        'category_id': item['budget'].category_id,
+        'category': item['budget'].category.name,
+        'amount': item['budget'].amount,
+        'spent': item['spent'],
+        'remaining': item['remaining'],
+        'percentage': item['percentage'],
+        'overspent': item['overspent']
+    }
+
+
+def serialize_budget(budget):
+    return {
+        'id': budget.id,
+        'category_id': budget.category_id,
+        'amount': budget.amount,
+        'month': budget.month,
+        'year': budget.year
+    }
+
+
+def cached_analytics(user_id, today=None):
+    """analytics_summary() for today, shared through the response cache with /api/insights.
+
+    The summary depends on the date (the current month, the elapsed part of
+    it and this month's budgets), so the cache key includes it.
+    """
+    today = today or datetime.now()
+
+    def build():
+        # Imported here so NumPy is only loaded on a cache miss (see create_app)
+        from analytics import analytics_summary
+        return analytics_summary(user_id, today)
+
+    return cached_body(cache_key('insights', user_id, f"{today:%Y-%m-%d}"), build)
@@ -0,0 +1,65 @@
+"""PDF and CSV downloads."""
+from flask import Blueprint, Response, flash, redirect, request, send_file, session, stream_with_context, url_for
+
+from models import ReportJob
+from exports import iter_csv
+from reports import request_report
+from metrics import measured_stream
+from replicas import replica_route, replica_stream
+
+bp = Blueprint('exports', __name__)
+
+
+# =====================
+# Export PDF
+# =====================
+@bp.route('/export/pdf')
+def export_pdf():
+    if "user_id" not in session:
+        return redirect(url_for('auth.login'))
+
+    job = request_report(session['user_id'])
+    if job.status == 'done':
+        return send_file(job.path, as_attachment=True, download_name="QuickLedger_Report.pdf", mimetype='application/pdf')
+
+    flash('Your PDF report is being generated. Try the download again in a moment.', 'info')
+    return redirect(url_for('transactions.dashboard'))
+
+
+@bp.route('/reports/<job_id>/download')
+def download_report(job_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    job = ReportJob.query.filter_by(id=job_id, user_id=session['user_id'], status='done').first()
+    if not job:
+        flash('Report not found or not ready yet.', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    return send_file(job.path, as_attachment=True, download_name="QuickLedger_Report.pdf", mimetype='application/pdf')
+
+
+# =====================
+# Export CSV
+# =====================
+@bp.route('/export/csv')
+@replica_route
+def export_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    compress = request.args.get('gzip') == '1'
+    rows = measured_stream('csv.gz' if compress else 'csv', replica_stream(iter_csv(
+        session['user_id'],
+        request.args.get('start_date'),
+        request.args.get('end_date'),
+        request.args.get('note'),
+        compress=compress
+    )))
+    filename = "transactions.csv.gz" if compress else "transactions.csv"
+
+    return Response(
+        stream_with_context(rows),
+        mimetype="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
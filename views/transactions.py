@@ -0,0 +1,224 @@
+"""Dashboard, transaction editing and CSV import."""
+import io
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+
+from models import db, User, Transaction, Category, RECURRENCE_RULES, DEFAULT_RECURRENCE, validate_amount
+from aggregates import ledger_queries, dashboard_summary
+from rollups import add_to_rollup, remove_from_rollup
+from replicas import replica_route
+from views.common import cached_analytics, paginate_transactions
+
+bp = Blueprint('transactions', __name__)
+
+
+# =====================
+# Dashboard
+# =====================
+@bp.route('/dashboard', methods=['GET', 'POST'])
+@replica_route
+def dashboard():
+    if "user_id" not in session:
+        return redirect(url_for('auth.login'))
+
+    if request.method == 'POST':
+        try:
+            amount = validate_amount(request.form.get('amount', 0))
+            category = Category.query.filter_by(
+                id=request.form.get('category_id', type=int),
+                user_id=session['user_id']
+            ).first()
+            note = request.form.get('note', '').strip()
+            is_recurring = request.form.get('is_recurring') == 'on'
+            recurrence_type = request.form.get('recurrence_type')
+            if recurrence_type not in RECURRENCE_RULES:
+                recurrence_type = DEFAULT_RECURRENCE
+
+            if amount <= 0:
+                flash('Amount must be greater than zero.', 'danger')
+                return redirect(url_for('transactions.dashboard'))
+            
+            if not category:
+                flash('Category is required.', 'danger')
+                return redirect(url_for('transactions.dashboard'))
+
+            new_txn = Transaction(
+                amount=amount,
+                category_id=category.id,
+                note=note,
+                user_id=session['user_id'],
+                is_recurring=is_recurring,
+                recurrence_type=recurrence_type if is_recurring else None
+            )
+            db.session.add(new_txn)
+            db.session.flush()
+            add_to_rollup(new_txn)
+            User.bump_data_version(session['user_id'])
+            db.session.commit()
+            flash('Transaction added successfully!', 'success')
+        except ValueError:
+            flash('Invalid amount entered.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash('Error adding transaction. Please try again.', 'danger')
+
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    search_note = request.args.get('note')
+
+    queries = ledger_queries(session['user_id'], start_date, end_date, search_note)
+
+    # Only the first page is rendered; the rest is loaded from /api/transactions
+    try:
+        transactions, next_cursor = paginate_transactions(queries, request.args.get('cursor'))
+    except ValueError:
+        transactions, next_cursor = paginate_transactions(queries)
+
+    user_categories = Category.query.filter_by(user_id=session['user_id']).all()
+
+    # Totals, charts, insights and budget status come from one shared aggregation
+    summary = dashboard_summary(session['user_id'], start_date, end_date, search_note)
+    income = summary['income']
+    expense = summary['expense']
+    balance = summary['balance']
+
+    categories = [c['name'] for c in summary['top_expenses']]
+    amounts = [c['total'] for c in summary['top_expenses']]
+    monthly_summary = summary['monthly']
+
+    # Budgets already over their limit this month
+    overspent_budgets = [b for b in summary['budgets'] if b['overspent']]
+    insights = summary['insights']
+
+    # Anomalies and month-end forecasts always cover the whole history; cached with /api/insights
+    analytics = current_app.json.loads(cached_analytics(session['user_id']))
+    insights['anomalies'] = analytics['anomalies']
+    insights['forecast_overruns'] = [
+        f for f in analytics['budget_forecasts']
+        if f['will_exceed'] and f['spent'] <= f['amount']
+    ]
+
+    return render_template(
+        'dashboard.html',
+        email=session['email'],
+        transactions=transactions,
+        next_cursor=next_cursor,
+        income=income,
+        expense=expense,
+        balance=balance,
+        start_date=start_date,
+        end_date=end_date,
+        search_note=search_note,
+        categories=categories,
+        amounts=amounts,
+        monthly_data=monthly_summary,
+        user_categories=user_categories,
+        insights=insights,
+        overspent_budgets=overspent_budgets,
+        breakdown=summary['breakdown']
+    )
+
+
+# =====================
+# Edit Transaction
+# =====================
+@bp.route('/edit/<int:transaction_id>', methods=['GET', 'POST'])
+def edit_transaction(transaction_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    transaction = Transaction.query.filter_by(id=transaction_id, user_id=session['user_id']).first()
+    
+    if not transaction:
+        flash('Transaction not found.', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    if request.method == 'POST':
+        try:
+            category = Category.query.filter_by(
+                id=request.form.get('category_id', type=int),
+                user_id=session['user_id']
+            ).first()
+            if not category:
+                flash('Category is required.', 'danger')
+                return redirect(url_for('transactions.edit_transaction', transaction_id=transaction_id))
+
+            remove_from_rollup(transaction)
+            transaction.amount = validate_amount(request.form.get('amount', 0))
+            transaction.category_id = category.id
+            transaction.note = request.form.get('note', '').strip()
+            transaction.is_recurring = request.form.get('is_recurring') == 'on'
+            recurrence_type = request.form.get('recurrence_type')
+            if recurrence_type not in RECURRENCE_RULES:
+                recurrence_type = DEFAULT_RECURRENCE
+            transaction.recurrence_type = recurrence_type if transaction.is_recurring else None
+            add_to_rollup(transaction)
+            User.bump_data_version(session['user_id'])
+            
+            db.session.commit()
+            flash('Transaction updated successfully!', 'success')
+            return redirect(url_for('transactions.dashboard'))
+        except ValueError:
+            db.session.rollback()
+            flash('Invalid amount entered.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash('Error updating transaction.', 'danger')
+    
+    user_categories = Category.query.filter_by(user_id=session['user_id']).all()
+    return render_template('edit_transaction.html', transaction=transaction, user_categories=user_categories)
+
+
+# =====================
+# Delete Transaction
+# =====================
+@bp.route('/delete/<int:transaction_id>', methods=['POST'])
+def delete_transaction(transaction_id):
+    if 'user_id' not in session:
+        return redirect('/login')
+
+    transaction = Transaction.query.filter_by(id=transaction_id, user_id=session['user_id']).first()
+
+    if transaction:
+        remove_from_rollup(transaction)
+        db.session.delete(transaction)
+        User.bump_data_version(session['user_id'])
+        db.session.commit()
+        flash('Transaction deleted successfully!', 'success')
+    else:
+        flash('Transaction not found.', 'danger')
+
+    return redirect('/dashboard')
+
+
+# =====================
+# Import CSV
+# =====================
+@bp.route('/import/csv', methods=['POST'])
+def import_transactions():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    from importer import ImportFormatError, import_csv
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a CSV file to import.', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    try:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        result = import_csv(session['user_id'], stream, dayfirst=request.form.get('dayfirst') == 'on')
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        flash(f'Could not import file: {e}', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    flash(
+        f"Imported {result['imported']} transaction(s), skipped {result['duplicates']} duplicate(s)"
+        f" and {result['error_count']} invalid row(s).",
+        'success' if result['imported'] else 'info'
+    )
+    if result['created_categories']:
+        flash(f"Created categories: {', '.join(result['created_categories'])}.", 'info')
+    return redirect(url_for('transactions.dashboard'))
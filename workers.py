@@ -0,0 +1,32 @@
+"""Background threads and worker pools, one set per process.
+
+gunicorn builds the app in its master and forks the workers from it (see
+gunicorn.conf.py). A thread does not survive a fork, and a pool copied
+into a child still counts the parent's threads as its own, so nothing
+that owns threads is created at import time. It is built on first use in
+each process instead, and built again the first time a forked child
+uses it.
+"""
+import functools
+import os
+import threading
+
+
+def per_process(factory):
+    """Decorator running ``factory`` once per process and returning that result on every later call.
+
+    Arguments of later calls in the same process are ignored.
+    """
+    lock = threading.Lock()
+    built = {}  # pid -> factory result
+
+    @functools.wraps(factory)
+    def get(*args, **kwargs):
+        pid = os.getpid()
+        with lock:
+            if pid not in built:
+                built.clear()
+                built[pid] = factory(*args, **kwargs)
+            return built[pid]
+
+    return get